@@ -6,12 +6,86 @@ Safety rules and analysis for Gmail filter inference.
 Provides detection of security-sensitive filters and action conflicts
 to prevent inappropriate merging of filters during inference.
 """
-from typing import Dict, List, Tuple, Optional, Any
+import re
+from itertools import chain
+from typing import Dict, FrozenSet, Hashable, List, Tuple, Optional, Any
+
+
+# Key under which remembered decisions are stored:
+# (parent keys, child keys, child is security-sensitive, filters have action conflicts)
+PatternKey = Tuple[FrozenSet[str], FrozenSet[str], bool, bool]
+
+
+def _archive_conflict(parent_has: bool, parent_archives: bool,
+                      child_has: bool, child_archives: bool) -> Optional[Tuple[str, str]]:
+    """
+    Decide the archive-state conflict between a parent and a child filter.
+    
+    Args:
+        parent_has: Whether the parent sets 'archive' at all
+        parent_archives: Whether the parent's 'archive' is truthy
+        child_has: Whether the child sets 'archive' at all
+        child_archives: Whether the child's 'archive' is truthy
+        
+    Returns:
+        (parent_state, child_state) conflict tuple, or None
+    """
+    # Check if they have explicitly different archive behaviors
+    # (one archives, one doesn't, and it's not just a missing value)
+    if parent_has and child_has:
+        if parent_archives != child_archives:
+            if parent_archives:
+                return ('archive=true', 'archive=false')
+            return ('archive=false', 'archive=true')
+    elif parent_archives and not child_has:
+        # Parent archives but child doesn't specify - child might be intended to stay in inbox
+        # This is a warning-level conflict, not critical
+        return ('archive', 'no-archive-specified')
+    elif not parent_archives and child_archives:
+        # Parent doesn't archive but child does - conflicting intent
+        return ('no-archive', 'archive')
+    return None
+
+
+# Every archive-state combination decided up front, indexed by the four flags
+# packed as bits (parent_has, parent_archives, child_has, child_archives)
+_ARCHIVE_CONFLICTS = tuple(
+    _archive_conflict(bool(i & 8), bool(i & 4), bool(i & 2), bool(i & 1)) for i in range(16)
+)
+
+
+# Filter keys shown by format_filter_summary: conditions first, then actions
+_CONDITION_KEYS = ('from', 'to', 'subject', 'has', 'does_not_have', 'list')
+_ACTION_KEYS = ('label', 'archive', 'delete', 'star', 'important', 'not_important',
+                'forward', 'read', 'trash')
+
+
+def _iter_summary_lines(filter_dict: Dict, indent: str):
+    """Yield the display lines for InferenceSafety.format_filter_summary."""
+    # Show conditions first
+    for key in _CONDITION_KEYS:
+        if key in filter_dict:
+            value = filter_dict[key]
+            if isinstance(value, list):
+                value = ', '.join(str(v) for v in value)
+            yield f"{indent}{key}: {value}"
+    
+    # Show actions
+    for key in _ACTION_KEYS:
+        value = filter_dict.get(key)
+        if value:
+            if isinstance(value, bool):
+                value = 'yes'
+            elif isinstance(value, list):
+                value = ', '.join(str(v) for v in value)
+            yield f"{indent}{key}: {value}"
 
 
 class InferenceSafety:
     """Safety rules and analysis for filter inference."""
     
+    __slots__ = ('verbose', 'collect_all_warnings', 'decision_memory', '_sec_cache')
+    
     # Security-related keywords that suggest a filter shouldn't be merged
     SECURITY_KEYWORDS = [
         'password', 'reset', 'verification', 'verify', 'verified',
@@ -21,6 +95,21 @@ class InferenceSafety:
         'authorization', 'account', 'signin', 'sign-in', 'login', 'log-in'
     ]
     
+    # Fields to check for security keywords
+    SECURITY_TEXT_FIELDS = ('subject', 'has', 'from', 'to', 'label')
+    
+    # All security keywords folded into a single alternation so each value is
+    # scanned once instead of once per keyword. Keywords must start a word
+    # ('code' shouldn't match 'barcode') but may be extended ('passwords').
+    _SECURITY_RE = re.compile(r'\b(?:' + '|'.join(map(re.escape, SECURITY_KEYWORDS)) + ')',
+                              re.IGNORECASE)
+    
+    # Label fragments that hint at a filter's purpose
+    SECURITY_LABELS = ['security', 'auth', 'verification', 'important', 'urgent']
+    AUTOMATED_LABELS = ['automated', 'notification', 'no-reply', 'newsletter', 'marketing']
+    _SECURITY_LABEL_RE = re.compile('|'.join(map(re.escape, SECURITY_LABELS)))
+    _AUTOMATED_LABEL_RE = re.compile('|'.join(map(re.escape, AUTOMATED_LABELS)))
+    
     # Action pairs that conflict with each other
     CONFLICTING_ACTION_PAIRS = [
         ('archive', 'not_archive'),
@@ -31,6 +120,13 @@ class InferenceSafety:
         ('star', 'unstar'),
     ]
     
+    # Unordered pairs, so one membership test covers both directions,
+    # plus a rank so conflicts are reported in CONFLICTING_ACTION_PAIRS order
+    _CONFLICT_PAIRS = frozenset(map(frozenset, CONFLICTING_ACTION_PAIRS))
+    _CONFLICT_KEYS = frozenset(chain.from_iterable(CONFLICTING_ACTION_PAIRS))
+    _CONFLICT_RANK = {action: rank for rank, action in
+                      enumerate(chain.from_iterable(CONFLICTING_ACTION_PAIRS))}
+    
     # Actions that shouldn't be inherited for security reasons
     DANGEROUS_TO_INHERIT = [
         'archive',  # Security emails should stay in inbox
@@ -39,15 +135,28 @@ class InferenceSafety:
         'read',     # Security emails should be noticed
     ]
     
-    def __init__(self, verbose: bool = False):
+    def __init__(self, verbose: bool = False, collect_all_warnings: bool = False):
         """
         Initialize the safety analyzer.
         
         Args:
             verbose: Whether to print detailed analysis
+            collect_all_warnings: Run every check even once a merge is known
+                to be unsafe, so the full list of warnings can be shown
         """
         self.verbose = verbose
+        self.collect_all_warnings = collect_all_warnings
         self.decision_memory = {}  # Remember user decisions for similar patterns
+        self._sec_cache: Dict[int, Tuple[Dict, bool]] = {}  # id(filter) -> (filter, sensitive)
+    
+    def clear_caches(self):
+        """
+        Forget cached per-filter analysis results.
+        
+        Called at the start of each merge analysis so that filters mutated
+        between analyses are re-scanned.
+        """
+        self._sec_cache.clear()
     
     def analyze_merge_safety(self, parent: Dict, child: Dict) -> Dict:
         """
@@ -63,13 +172,48 @@ class InferenceSafety:
                 - confidence: Confidence score (0-100)
                 - warnings: List of warning messages
                 - severity: 'low', 'medium', 'high', 'critical'
+                - pattern_key: Key for remembering decisions about this pattern
+        """
+        self.clear_caches()
+        return self._analyze_pair(parent, child)
+    
+    def analyze_merge_safety_batch(self, parent: Dict, children: List[Dict]) -> List[Dict]:
+        """
+        Analyze the safety of merging each of several children into one parent.
+        
+        Equivalent to calling analyze_merge_safety for each child, but every
+        distinct child is scanned for security keywords only once per batch.
+        
+        Args:
+            parent: Parent filter dict
+            children: Child filter dicts that would inherit from parent
+            
+        Returns:
+            List of safety analysis dictionaries, one per child, in order
+        """
+        self.clear_caches()
+        for child in children:
+            self._is_security_sensitive(child)
+        return [self._analyze_pair(parent, child) for child in children]
+    
+    def _analyze_pair(self, parent: Dict, child: Dict) -> Dict:
+        """
+        Analyze one parent/child merge using whatever is already cached.
+        
+        Args:
+            parent: Parent filter dict
+            child: Child filter dict that would inherit from parent
+            
+        Returns:
+            Safety analysis dictionary (see analyze_merge_safety)
         """
         warnings = []
         confidence = 100
         severity = 'low'
         
         # Check if child is security-sensitive
-        if self._is_security_sensitive(child):
+        is_security = self._is_security_sensitive(child)
+        if is_security:
             warnings.append("⚠️  Security-sensitive: Contains security-related keywords")
             confidence -= 40
             severity = 'high'
@@ -83,6 +227,8 @@ class InferenceSafety:
         
         # Check for action conflicts
         conflicts = self._get_action_conflicts(parent, child)
+        pattern_key = self.create_pattern_key(parent, child, is_security=is_security,
+                                              has_conflicts=bool(conflicts))
         if conflicts:
             conflict_strs = []
             has_archive_conflict = False
@@ -107,6 +253,9 @@ class InferenceSafety:
                 if severity == 'low':
                     severity = 'medium'
         
+        if self._verdict_is_final(confidence, severity):
+            return self._merge_safety_result(confidence, warnings, severity, pattern_key)
+        
         # Check forwarding conflicts
         forward_conflict = self._check_forwarding_conflict(parent, child)
         if forward_conflict:
@@ -114,12 +263,33 @@ class InferenceSafety:
             confidence -= 50
             severity = 'critical'
         
+        if self._verdict_is_final(confidence, severity):
+            return self._merge_safety_result(confidence, warnings, severity, pattern_key)
+        
         # Check label compatibility
         label_warning = self._check_label_compatibility(parent, child)
         if label_warning:
             warnings.append(f"ℹ️  Label mismatch: {label_warning}")
             confidence -= 10
         
+        return self._merge_safety_result(confidence, warnings, severity, pattern_key)
+    
+    def _verdict_is_final(self, confidence: int, severity: str) -> bool:
+        """
+        Check whether the remaining checks can no longer change the verdict.
+        
+        Once a merge is critical and confidence has bottomed out, later checks
+        would only add warnings, so they are skipped unless the caller wants
+        every warning (or verbose output is on).
+        """
+        if self.collect_all_warnings or self.verbose:
+            return False
+        return severity == 'critical' and confidence <= 0
+    
+    @staticmethod
+    def _merge_safety_result(confidence: int, warnings: List[str], severity: str,
+                             pattern_key: PatternKey) -> Dict:
+        """Build the analyze_merge_safety result dictionary."""
         # Determine overall safety
         safe = confidence > 50 and severity != 'critical'
         
@@ -127,7 +297,8 @@ class InferenceSafety:
             'safe': safe,
             'confidence': max(0, confidence),
             'warnings': warnings,
-            'severity': severity
+            'severity': severity,
+            'pattern_key': pattern_key,
         }
     
     def _is_security_sensitive(self, filter_dict: Dict) -> bool:
@@ -140,24 +311,53 @@ class InferenceSafety:
         Returns:
             True if filter appears security-related
         """
-        # Fields to check for security keywords
-        text_fields = ['subject', 'has', 'from', 'to', 'label']
+        # The cached filter is kept alongside the result so its id can't be reused
+        cached = self._sec_cache.get(id(filter_dict))
+        if cached is not None and cached[0] is filter_dict:
+            return cached[1]
+        
+        result = self._scan_security_keywords(filter_dict)
+        self._sec_cache[id(filter_dict)] = (filter_dict, result)
+        return result
+    
+    def _scan_security_keywords(self, filter_dict: Dict) -> bool:
+        """
+        Scan a filter's text fields for security keywords (uncached).
         
-        for field in text_fields:
+        Args:
+            filter_dict: Filter dictionary to check
+            
+        Returns:
+            True if any text field contains a security keyword
+        """
+        if not self.verbose:
+            # One scan over all text values; the newline keeps values apart
+            haystack = '\n'.join(str(val) for _, val in self._iter_text_values(filter_dict))
+            return self._SECURITY_RE.search(haystack) is not None
+        
+        for field, val in self._iter_text_values(filter_dict):
+            match = self._SECURITY_RE.search(str(val))
+            if match:
+                print(f"  Security keyword '{match.group()}' found in {field}: {val}")
+                return True
+        
+        return False
+    
+    def _iter_text_values(self, filter_dict: Dict):
+        """
+        Yield (field, value) for each text value that may hold security keywords.
+        
+        Args:
+            filter_dict: Filter dictionary to check
+        """
+        for field in self.SECURITY_TEXT_FIELDS:
             if field in filter_dict:
                 value = filter_dict[field]
                 # Handle both string and list values
                 values = [value] if isinstance(value, str) else value if isinstance(value, list) else []
                 
                 for val in values:
-                    val_lower = str(val).lower()
-                    for keyword in self.SECURITY_KEYWORDS:
-                        if keyword in val_lower:
-                            if self.verbose:
-                                print(f"  Security keyword '{keyword}' found in {field}: {val}")
-                            return True
-        
-        return False
+                    yield field, val
     
     def _get_action_conflicts(self, parent: Dict, child: Dict) -> List[Tuple[str, str]]:
         """
@@ -172,14 +372,15 @@ class InferenceSafety:
         """
         conflicts = []
         
-        for action1, action2 in self.CONFLICTING_ACTION_PAIRS:
-            # Check both directions
-            if action1 in parent and action2 in child:
-                if parent[action1] and child[action2]:  # Both are true/set
-                    conflicts.append((action1, action2))
-            elif action2 in parent and action1 in child:
-                if parent[action2] and child[action1]:
-                    conflicts.append((action2, action1))
+        # Only actions that are set on both sides can conflict
+        parent_hits = {k for k, v in parent.items() if v} & self._CONFLICT_KEYS
+        if parent_hits:
+            child_hits = {k for k, v in child.items() if v} & self._CONFLICT_KEYS
+            rank = self._CONFLICT_RANK.__getitem__
+            for parent_action in sorted(parent_hits, key=rank):
+                for child_action in sorted(child_hits, key=rank):
+                    if frozenset((parent_action, child_action)) in self._CONFLICT_PAIRS:
+                        conflicts.append((parent_action, child_action))
         
         # Special case: archive in parent but important in child
         if parent.get('archive') and child.get('important'):
@@ -191,24 +392,11 @@ class InferenceSafety:
         
         # Special case: Different archive states
         # This is critical because it fundamentally changes where messages end up
-        parent_archives = parent.get('archive', False)
-        child_archives = child.get('archive', False)
-        
-        # Check if they have explicitly different archive behaviors
-        # (one archives, one doesn't, and it's not just a missing value)
-        if 'archive' in parent and 'archive' in child:
-            if parent_archives != child_archives:
-                if parent_archives:
-                    conflicts.append(('archive=true', 'archive=false'))
-                else:
-                    conflicts.append(('archive=false', 'archive=true'))
-        elif parent_archives and 'archive' not in child:
-            # Parent archives but child doesn't specify - child might be intended to stay in inbox
-            # This is a warning-level conflict, not critical
-            conflicts.append(('archive', 'no-archive-specified'))
-        elif not parent_archives and child.get('archive'):
-            # Parent doesn't archive but child does - conflicting intent
-            conflicts.append(('no-archive', 'archive'))
+        archive_state = (('archive' in parent) << 3 | bool(parent.get('archive')) << 2 |
+                         ('archive' in child) << 1 | bool(child.get('archive')))
+        archive_conflict = _ARCHIVE_CONFLICTS[archive_state]
+        if archive_conflict:
+            conflicts.append(archive_conflict)
         
         return conflicts
     
@@ -273,25 +461,21 @@ class InferenceSafety:
         parent_labels = [parent_label] if isinstance(parent_label, str) else parent_label
         child_labels = [child_label] if isinstance(child_label, str) else child_label
         
-        # Check for semantic differences
-        security_labels = ['security', 'auth', 'verification', 'important', 'urgent']
-        automated_labels = ['automated', 'notification', 'no-reply', 'newsletter', 'marketing']
+        # Check for semantic differences (duplicates only need checking once)
+        parent_lower = {str(label).lower() for label in parent_labels}
+        child_lower = {str(label).lower() for label in child_labels}
         
-        parent_is_security = any(any(sec in str(label).lower() for sec in security_labels) 
-                                 for label in parent_labels)
-        child_is_security = any(any(sec in str(label).lower() for sec in security_labels) 
-                               for label in child_labels)
+        parent_is_security = any(self._SECURITY_LABEL_RE.search(label) for label in parent_lower)
+        child_is_security = any(self._SECURITY_LABEL_RE.search(label) for label in child_lower)
         
-        parent_is_automated = any(any(auto in str(label).lower() for auto in automated_labels) 
-                                  for label in parent_labels)
-        child_is_automated = any(any(auto in str(label).lower() for auto in automated_labels) 
-                                 for label in child_labels)
+        parent_is_automated = any(self._AUTOMATED_LABEL_RE.search(label) for label in parent_lower)
+        child_is_automated = any(self._AUTOMATED_LABEL_RE.search(label) for label in child_lower)
         
         if parent_is_automated and child_is_security:
             return "Parent appears automated, child appears security-related"
         elif parent_is_security and child_is_automated:
             return "Parent appears security-related, child appears automated"
-        elif parent_label != child_label and not any(p in child_labels for p in parent_labels):
+        elif parent_label != child_label and set(parent_labels).isdisjoint(child_labels):
             # Different labels with no overlap
             return f"Different labels suggest different purposes"
         
@@ -308,34 +492,9 @@ class InferenceSafety:
         Returns:
             Formatted string representation
         """
-        lines = []
-        
-        # Show conditions first
-        condition_keys = ['from', 'to', 'subject', 'has', 'does_not_have', 'list']
-        for key in condition_keys:
-            if key in filter_dict:
-                value = filter_dict[key]
-                if isinstance(value, list):
-                    value = ', '.join(str(v) for v in value)
-                lines.append(f"{indent}{key}: {value}")
-        
-        # Show actions
-        action_keys = ['label', 'archive', 'delete', 'star', 'important', 'not_important', 
-                      'forward', 'read', 'trash']
-        for key in action_keys:
-            if key in filter_dict and filter_dict[key]:
-                value = filter_dict[key]
-                if isinstance(value, bool):
-                    lines.append(f"{indent}{key}: yes")
-                elif isinstance(value, list):
-                    value = ', '.join(str(v) for v in value)
-                    lines.append(f"{indent}{key}: {value}")
-                else:
-                    lines.append(f"{indent}{key}: {value}")
-        
-        return '\n'.join(lines)
+        return '\n'.join(_iter_summary_lines(filter_dict, indent))
     
-    def remember_decision(self, pattern_key: str, decision: str):
+    def remember_decision(self, pattern_key: Hashable, decision: str):
         """
         Remember a user's decision for a pattern.
         
@@ -345,7 +504,7 @@ class InferenceSafety:
         """
         self.decision_memory[pattern_key] = decision
     
-    def get_remembered_decision(self, pattern_key: str) -> Optional[str]:
+    def get_remembered_decision(self, pattern_key: Hashable) -> Optional[str]:
         """
         Get a remembered decision for a pattern.
         
@@ -357,25 +516,28 @@ class InferenceSafety:
         """
         return self.decision_memory.get(pattern_key)
     
-    def create_pattern_key(self, parent: Dict, child: Dict) -> str:
+    def create_pattern_key(self, parent: Dict, child: Dict, *,
+                           is_security: Optional[bool] = None,
+                           has_conflicts: Optional[bool] = None) -> PatternKey:
         """
         Create a key for remembering decisions about similar patterns.
         
         Args:
             parent: Parent filter
             child: Child filter
+            is_security: Whether child is security-sensitive, if already known
+            has_conflicts: Whether the filters have action conflicts, if already known
             
         Returns:
-            Pattern key string
+            Hashable pattern key
         """
-        # Create a key based on the presence of certain conditions/actions
-        parent_keys = set(parent.keys())
-        child_keys = set(child.keys())
-        
         # Include security sensitivity in the key
-        is_security = 'sec' if self._is_security_sensitive(child) else 'nosec'
+        if is_security is None:
+            is_security = self._is_security_sensitive(child)
         
         # Include presence of key actions
-        has_conflicts = 'conflict' if self._get_action_conflicts(parent, child) else 'noconflict'
+        if has_conflicts is None:
+            has_conflicts = bool(self._get_action_conflicts(parent, child))
         
-        return f"{sorted(parent_keys)}_{sorted(child_keys)}_{is_security}_{has_conflicts}"
\ No newline at end of file
+        # Create a key based on the presence of certain conditions/actions
+        return (frozenset(parent), frozenset(child), is_security, has_conflicts)
@@ -14,35 +14,53 @@ Commands:
 from __future__ import print_function, unicode_literals
 
 import argparse
+import hashlib
+import io
+import mmap
 import os
+import pickle
 import re
+import stat
 import sys
+import tempfile
+from contextlib import contextmanager
+from functools import cache
+from itertools import chain
 from pathlib import Path
 
 import yaml
 from lxml import etree
 
-from .ruleset import RuleSet, ruleset_to_etree
-from .upload import (
-    get_gmail_credentials,
-    get_gmail_service,
-    prune_filters_not_in_ruleset,
-    prune_labels_not_in_ruleset,
-    upload_ruleset,
-)
-from .xml_converter import GmailFilterConverter
+try:
+    # libyaml-backed loader; much faster on large filter files
+    from yaml import CSafeLoader as YAMLLoader
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as YAMLLoader
 
+from .ruleset import RuleSet, ruleset_to_etree, write_ruleset_xml
+# .upload pulls in the Google API client, which is slow to import; the
+# commands that talk to Gmail import it themselves
+from .xml_converter import GmailFilterConverter, parse_xml
 
-def ruleset_to_xml(ruleset, pretty_print=True, encoding="utf8"):
-    """Convert a RuleSet to Gmail XML format."""
+
+def ruleset_to_xml_bytes(ruleset, pretty_print=True, encoding="utf8"):
+    """Convert a RuleSet to encoded Gmail XML, ready to write to a binary stream."""
     dom = ruleset_to_etree(ruleset)
-    chars = etree.tostring(
+    return etree.tostring(
         dom,
         encoding=encoding,
         pretty_print=pretty_print,
         xml_declaration=True,
     )
-    return chars.decode(encoding)
+
+
+def ruleset_to_xml(ruleset, pretty_print=True, encoding="utf8"):
+    """Convert a RuleSet to Gmail XML format."""
+    return ruleset_to_xml_bytes(ruleset, pretty_print, encoding).decode(encoding)
+
+
+# A leading "key:" mapping entry, as at the top of a single-rule YAML file
+_YAML_KEY_RE = re.compile(rb'[A-Za-z_][\w-]*\s*:')
 
 
 def detect_file_format(filepath):
@@ -55,28 +73,36 @@ def detect_file_format(filepath):
     elif path.suffix.lower() in ['.yaml', '.yml']:
         return 'yaml'
     
-    # Try to detect from content
+    # Try to detect from the first few bytes; no need to parse the whole file
     try:
-        with open(filepath, 'r') as f:
-            first_line = f.readline().strip()
-            if first_line.startswith('<?xml'):
-                return 'xml'
-            elif first_line.startswith('---') or first_line.startswith('-'):
-                return 'yaml'
-    except:
-        pass
+        with open(filepath, 'rb') as f:
+            head = f.read(512)
+    except OSError:
+        return 'xml'
     
-    # Default guess based on trying to parse as YAML
-    try:
-        with open(filepath, 'r') as f:
-            yaml.safe_load(f)
-        return 'yaml'
-    except:
+    head = head.lstrip(b'\xef\xbb\xbf').lstrip()
+    if head.startswith(b'<'):
         return 'xml'
+    if not head or head.startswith((b'---', b'-', b'#', b'[', b'{')) or _YAML_KEY_RE.match(head):
+        return 'yaml'
+    return 'xml'
+
 
+def parse_batch_size(value):
+    """Parse a --batch-size value; Gmail accepts at most 50 requests per batch."""
+    size = int(value)
+    if not 1 <= size <= 50:
+        raise argparse.ArgumentTypeError(f"batch size must be between 1 and 50, got {size}")
+    return size
 
+
+@cache
 def create_parser():
-    """Create the argument parser with subcommands."""
+    """
+    Create the argument parser with subcommands.
+    
+    The parser is built once and reused; parse_args() leaves it unchanged.
+    """
     parser = argparse.ArgumentParser(
         prog='gmail-yaml-filters',
         description='Manage Gmail filters with YAML configuration files',
@@ -86,6 +112,7 @@ Examples:
   # Generate Gmail XML from YAML (original behavior)
   gmail-yaml-filters my-filters.yaml > filters.xml
   gmail-yaml-filters export my-filters.yaml -o filters.xml
+  gmail-yaml-filters export work.yaml personal.yaml -o filters.xml
   
   # Convert between formats
   gmail-yaml-filters convert mailFilters.xml -o my-filters.yaml
@@ -120,10 +147,21 @@ Examples:
         'yaml_file',
         help='YAML filter file to convert'
     )
+    export_parser.add_argument(
+        'more_yaml_files',
+        nargs='*',
+        metavar='yaml_file',
+        help='Additional YAML filter files to include in the same export'
+    )
     export_parser.add_argument(
         '-o', '--output',
         help='Output XML file (default: stdout)'
     )
+    export_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always re-parse YAML files instead of using the parse cache'
+    )
     
     # ========== CONVERT command (bidirectional conversion) ==========
     convert_parser = subparsers.add_parser(
@@ -221,6 +259,17 @@ Examples:
         action='store_true',
         help='Preview changes without making API calls'
     )
+    sync_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always re-parse the YAML file instead of using the parse cache'
+    )
+    sync_parser.add_argument(
+        '--batch-size',
+        type=parse_batch_size,
+        default=50,
+        help='Gmail API requests to send per HTTP round trip (1-50, default: 50)'
+    )
     sync_parser.add_argument(
         '--prune-labels',
         action='store_true',
@@ -258,6 +307,17 @@ Examples:
         action='store_true',
         help='Preview changes without making API calls'
     )
+    upload_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always re-parse the YAML file instead of using the parse cache'
+    )
+    upload_parser.add_argument(
+        '--batch-size',
+        type=parse_batch_size,
+        default=50,
+        help='Gmail API requests to send per HTTP round trip (1-50, default: 50)'
+    )
     upload_parser.add_argument(
         '--client-secret',
         help='Path to client_secret.json (default: same dir as YAML file)'
@@ -285,6 +345,17 @@ Examples:
         action='store_true',
         help='Preview changes without making API calls'
     )
+    prune_parser.add_argument(
+        '--no-cache',
+        action='store_true',
+        help='Always re-parse the YAML file instead of using the parse cache'
+    )
+    prune_parser.add_argument(
+        '--batch-size',
+        type=parse_batch_size,
+        default=50,
+        help='Gmail API requests to send per HTTP round trip (1-50, default: 50)'
+    )
     prune_parser.add_argument(
         '--prune-labels',
         action='store_true',
@@ -310,22 +381,156 @@ Examples:
     return parser
 
 
-def load_yaml_filters(yaml_file):
-    """Load and parse YAML filter file."""
-    if yaml_file == '-':
-        data = yaml.safe_load(sys.stdin)
-    else:
-        with open(yaml_file) as f:
-            data = yaml.safe_load(f)
+def yaml_cache_enabled():
+    """Whether parsed YAML may be cached on disk (disable with GYF_CACHE=0)."""
+    return os.environ.get('GYF_CACHE', '1') != '0'
+
+
+def _yaml_cache_path(content):
+    """Cache file for the parsed form of the given YAML bytes (or buffer)."""
+    cache_home = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser("~"), ".cache")
+    # The personalization string versions the cache format
+    digest = hashlib.blake2b(content, digest_size=16, person=b'gyf-yaml-v2').hexdigest()
+    return os.path.join(cache_home, 'gmail-yaml-filters', digest + '.pickle')
+
+
+@contextmanager
+def _map_file(path):
+    """
+    Map a file read-only into memory, so the YAML parser and the cache hash
+    read its bytes without a buffered copy. Empty files yield b''; pipes,
+    FIFOs and devices can't be mapped, so their contents are read instead.
+    """
+    with open(path, 'rb') as f:
+        st = os.fstat(f.fileno())
+        if not stat.S_ISREG(st.st_mode):
+            yield f.read()
+            return
+        if st.st_size == 0:
+            # mmap rejects zero-length files
+            yield b''
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            if hasattr(mm, 'madvise') and hasattr(mmap, 'MADV_SEQUENTIAL'):
+                mm.madvise(mmap.MADV_SEQUENTIAL)
+            yield mm
+
+
+def _load_yaml_cached(content):
+    """Parse YAML bytes (or a buffer) into a list of documents, cached by content."""
+    cache_path = _yaml_cache_path(content)
+    try:
+        with open(cache_path, 'rb') as f:
+            return pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError, ValueError):
+        # Missing, unreadable, or corrupt cache entries are simply rebuilt
+        pass
     
-    if not isinstance(data, list):
-        data = [data]
+    documents = list(yaml.load_all(content, Loader=YAMLLoader))
     
-    return RuleSet.from_object(rule for rule in data if not rule.get("ignore"))
+    cache_dir = os.path.dirname(cache_path)
+    try:
+        os.makedirs(cache_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                pickle.dump(documents, f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.replace(tmp_path, cache_path)
+        except BaseException:
+            os.unlink(tmp_path)
+            raise
+    except OSError:
+        pass  # Caching is best-effort
+    
+    return documents
+
+
+# Strings shorter than this (label names, addresses, keys) are interned so
+# repeats across rules share one object
+_INTERN_MAX_LEN = 64
+
+
+def _intern_tree(obj):
+    """Return a copy of parsed YAML data with short strings interned."""
+    if isinstance(obj, dict):
+        return {
+            sys.intern(key) if isinstance(key, str) else key: _intern_tree(value)
+            for key, value in obj.items()
+        }
+    if isinstance(obj, list):
+        return [_intern_tree(item) for item in obj]
+    if isinstance(obj, str) and len(obj) < _INTERN_MAX_LEN:
+        return sys.intern(obj)
+    return obj
+
+
+def _iter_rules(documents):
+    """
+    Yield the rule dicts from a sequence of YAML documents, minus ignored rules.
+    
+    Each document may be a single rule or a (possibly nested) list of rules;
+    empty documents and entries are skipped.
+    """
+    for document in documents:
+        if document is None:
+            continue
+        if isinstance(document, list):
+            yield from _iter_rules(document)
+        # Anything that isn't a dict is left for RuleSet to reject
+        elif not (isinstance(document, dict) and document.get("ignore")):
+            yield _intern_tree(document)
+
+
+def load_yaml_rules(yaml_file, use_cache=False):
+    """
+    Yield the rule dicts from a YAML filter file, minus ignored rules.
+    
+    The file may hold a single list of rules or several '---'-separated
+    documents. Documents are parsed lazily, so only one needs to be in
+    memory at a time.
+    
+    With use_cache, the parsed file is cached on disk keyed by its content,
+    so re-running over an unchanged file skips YAML parsing. Stdin is never
+    cached.
+    """
+    if yaml_file == '-':
+        # Let the parser detect the encoding of the raw bytes, where possible
+        stdin = getattr(sys.stdin, 'buffer', sys.stdin)
+        yield from _iter_rules(yaml.load_all(stdin, Loader=YAMLLoader))
+    elif use_cache and yaml_cache_enabled():
+        with _map_file(yaml_file) as content:
+            documents = _load_yaml_cached(content)
+        yield from _iter_rules(documents)
+    else:
+        with _map_file(yaml_file) as content:
+            yield from _iter_rules(yaml.load_all(content, Loader=YAMLLoader))
+
+
+def load_yaml_filters(yaml_file, use_cache=False):
+    """Load and parse YAML filter file."""
+    return RuleSet.from_object(load_yaml_rules(yaml_file, use_cache=use_cache))
+
+
+# Label patterns that match every label name
+_MATCH_ALL_PATTERNS = frozenset({'', '.*', '.*?', '^.*', '^.*$'})
+
+
+def label_matcher(pattern):
+    """
+    Build the label-name filter for a --label-pattern regex.
+    
+    Returns None for patterns that match every label, so label pruning can
+    skip the per-label check entirely.
+    """
+    if pattern in _MATCH_ALL_PATTERNS:
+        return None
+    return re.compile(pattern).match
 
 
 def get_gmail_service_for_file(yaml_file, client_secret, credential_store, dry_run=False):
     """Get Gmail service, looking for client_secret in appropriate location."""
+    from .upload import get_gmail_credentials, get_gmail_service
+    
     if not client_secret:
         # Look for client_secret.json in same directory as YAML file
         if yaml_file != '-':
@@ -338,23 +543,50 @@ def get_gmail_service_for_file(yaml_file, client_secret, credential_store, dry_r
     return get_gmail_service(credentials, dry_run=dry_run)
 
 
+def write_stdout(write):
+    """
+    Call write() with a binary stream for stdout, bypassing text encoding.
+    
+    Falls back to buffering and decoding when stdout is text-only (e.g.
+    redirected to a StringIO in tests).
+    """
+    stdout = getattr(sys.stdout, 'buffer', None)
+    if stdout is None:
+        stdout = io.BytesIO()
+        write(stdout)
+        sys.stdout.write(stdout.getvalue().decode('utf8'))
+    else:
+        sys.stdout.flush()
+        write(stdout)
+        stdout.flush()
+
+
 def cmd_export(args):
     """Handle the export command (YAML to XML)."""
-    # Check if input file exists (unless it's stdin)
-    if args.yaml_file != '-' and not Path(args.yaml_file).exists():
-        print(f"Error: YAML file '{args.yaml_file}' not found", file=sys.stderr)
-        print(f"Please check the file path and try again.", file=sys.stderr)
-        sys.exit(1)
+    yaml_files = [args.yaml_file, *(getattr(args, 'more_yaml_files', None) or [])]
+    
+    # Check if input files exist (unless it's stdin)
+    for yaml_file in yaml_files:
+        if yaml_file != '-' and not Path(yaml_file).exists():
+            print(f"Error: YAML file '{yaml_file}' not found", file=sys.stderr)
+            print(f"Please check the file path and try again.", file=sys.stderr)
+            sys.exit(1)
+    
+    use_cache = not getattr(args, 'no_cache', False)
+    rule_objects = chain.from_iterable(
+        load_yaml_rules(yaml_file, use_cache=use_cache) for yaml_file in yaml_files
+    )
     
-    ruleset = load_yaml_filters(args.yaml_file)
-    xml_output = ruleset_to_xml(ruleset)
+    # Build every rule before writing anything, so a bad rule can't leave
+    # the output file (or a redirected stdout) half-written
+    ruleset = RuleSet.from_object(rule_objects)
     
     if args.output:
-        with open(args.output, 'w') as f:
-            f.write(xml_output)
+        with open(args.output, 'wb') as f:
+            write_ruleset_xml(ruleset, f)
         print(f"Exported {len(ruleset.rules)} filters to {args.output}", file=sys.stderr)
     else:
-        print(xml_output)
+        write_stdout(lambda stdout: write_ruleset_xml(ruleset, stdout))
 
 
 def cmd_convert(args):
@@ -414,14 +646,19 @@ def cmd_convert(args):
     try:
         if input_format == 'xml' and output_format == 'yaml':
             # XML to YAML
-            result = converter.xml_to_yaml(args.input_file, args.output)
-            if not args.output:
-                print(result)
+            if args.output or merge_filters or infer_more:
+                result = converter.xml_to_yaml(args.input_file, args.output)
+                if not args.output:
+                    write_stdout(lambda stdout: converter.dump_yaml(result, stdout))
+            else:
+                # Nothing needs the whole list, so print filters as they're converted
+                filters = converter.iter_xml_to_yaml(args.input_file)
+                write_stdout(lambda stdout: converter.dump_yaml(filters, stdout))
         else:
             # YAML to XML
             result = converter.yaml_to_xml(args.input_file, args.output)
             if not args.output:
-                print(result)
+                write_stdout(lambda stdout: stdout.write(result.encode('utf-8')))
         
         if args.verbose and args.output:
             stats = converter.get_stats()
@@ -478,7 +715,7 @@ def cmd_validate(args):
         else:
             print(f"🔄 Validating round-trip conversion for {args.xml_file}...", file=sys.stderr)
             
-        is_valid = converter.validate_round_trip(args.xml_file)
+        is_valid = converter.validate_round_trip(parse_xml(args.xml_file))
         stats = converter.get_stats()
         
         if is_valid:
@@ -498,88 +735,117 @@ def cmd_validate(args):
 
 def cmd_sync(args):
     """Handle the sync command (upload + prune)."""
+    from .upload import prune_filters_not_in_ruleset, prune_labels_not_in_ruleset, upload_ruleset
+    
     # Check if input file exists
     if not Path(args.yaml_file).exists():
         print(f"Error: YAML file '{args.yaml_file}' not found", file=sys.stderr)
         print(f"Please check the file path and try again.", file=sys.stderr)
         sys.exit(1)
     
-    ruleset = load_yaml_filters(args.yaml_file)
+    ruleset = load_yaml_filters(args.yaml_file, use_cache=not args.no_cache)
     service = get_gmail_service_for_file(
         args.yaml_file, args.client_secret, args.credential_store, args.dry_run
     )
     
     # Upload filters
-    upload_ruleset(ruleset, service=service, dry_run=args.dry_run)
+    upload_ruleset(
+        ruleset, service=service, dry_run=args.dry_run, batch_size=args.batch_size
+    )
     
     # Prune filters not in ruleset
-    prune_filters_not_in_ruleset(ruleset, service=service, dry_run=args.dry_run)
+    prune_filters_not_in_ruleset(
+        ruleset, service=service, dry_run=args.dry_run, batch_size=args.batch_size
+    )
     
     # Optionally prune labels
     if args.prune_labels:
-        match = re.compile(args.label_pattern).match
+        match = label_matcher(args.label_pattern)
         prune_labels_not_in_ruleset(
             ruleset, 
             service=service, 
             dry_run=args.dry_run,
             only_matching=match,
-            ignore_errors=False
+            ignore_errors=False,
+            batch_size=args.batch_size
         )
 
 
 def cmd_upload(args):
     """Handle the upload command."""
+    from .upload import upload_ruleset
+    
     # Check if input file exists
     if not Path(args.yaml_file).exists():
         print(f"Error: YAML file '{args.yaml_file}' not found", file=sys.stderr)
         print(f"Please check the file path and try again.", file=sys.stderr)
         sys.exit(1)
     
-    ruleset = load_yaml_filters(args.yaml_file)
+    ruleset = load_yaml_filters(args.yaml_file, use_cache=not args.no_cache)
     service = get_gmail_service_for_file(
         args.yaml_file, args.client_secret, args.credential_store, args.dry_run
     )
     
-    upload_ruleset(ruleset, service=service, dry_run=args.dry_run)
+    upload_ruleset(
+        ruleset, service=service, dry_run=args.dry_run, batch_size=args.batch_size
+    )
 
 
 def cmd_prune(args):
     """Handle the prune command."""
+    from .upload import prune_filters_not_in_ruleset, prune_labels_not_in_ruleset
+    
     # Check if input file exists
     if not Path(args.yaml_file).exists():
         print(f"Error: YAML file '{args.yaml_file}' not found", file=sys.stderr)
         print(f"Please check the file path and try again.", file=sys.stderr)
         sys.exit(1)
     
-    ruleset = load_yaml_filters(args.yaml_file)
+    ruleset = load_yaml_filters(args.yaml_file, use_cache=not args.no_cache)
     service = get_gmail_service_for_file(
         args.yaml_file, args.client_secret, args.credential_store, args.dry_run
     )
     
-    prune_filters_not_in_ruleset(ruleset, service=service, dry_run=args.dry_run)
+    prune_filters_not_in_ruleset(
+        ruleset, service=service, dry_run=args.dry_run, batch_size=args.batch_size
+    )
     
     # Optionally prune labels
     if args.prune_labels:
-        match = re.compile(args.label_pattern).match
+        match = label_matcher(args.label_pattern)
         prune_labels_not_in_ruleset(
             ruleset,
             service=service,
             dry_run=args.dry_run,
             only_matching=match,
-            ignore_errors=False
+            ignore_errors=False,
+            batch_size=args.batch_size
         )
 
 
+# Subcommand dispatch table; a first argument found here selects a
+# subcommand rather than a legacy export file
+_COMMANDS = {
+    'export': cmd_export,
+    'convert': cmd_convert,
+    'validate': cmd_validate,
+    'sync': cmd_sync,
+    'upload': cmd_upload,
+    'prune': cmd_prune,
+}
+
+
 def main():
     """Main entry point."""
     # Check for backward compatibility mode (no subcommand, just a file)
-    if len(sys.argv) > 1 and sys.argv[1] not in ['export', 'convert', 'validate', 'sync', 'upload', 'prune', '-h', '--help'] and not sys.argv[1].startswith('-'):
+    if len(sys.argv) > 1 and not sys.argv[1].startswith('-') and sys.argv[1] not in _COMMANDS:
         # This looks like backward compatibility mode: gmail-yaml-filters file.yaml
-        yaml_file_path = sys.argv[1]
-        class ExportArgs:
-            yaml_file = yaml_file_path
-            output = None
-        cmd_export(ExportArgs())
+        cmd_export(argparse.Namespace(
+            yaml_file=sys.argv[1],
+            more_yaml_files=[],
+            output=None,
+            no_cache=False,
+        ))
         return
     
     parser = create_parser()
@@ -592,16 +858,7 @@ def main():
         return
     
     # Execute the appropriate command
-    commands = {
-        'export': cmd_export,
-        'convert': cmd_convert,
-        'validate': cmd_validate,
-        'sync': cmd_sync,
-        'upload': cmd_upload,
-        'prune': cmd_prune,
-    }
-    
-    command_func = commands.get(args.command)
+    command_func = _COMMANDS.get(args.command)
     if command_func:
         try:
             command_func(args)
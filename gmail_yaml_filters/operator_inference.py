@@ -10,6 +10,145 @@ import re
 from typing import Dict, List, Optional, Union, Any
 
 
+# Search-string patterns, compiled once
+_CURLY_RE = re.compile(r'^\{([^}]+)\}$')
+_PAREN_RE = re.compile(r'^\(([^)]+)\)$')
+
+# The complex patterns start differently ('-(', '-{', '('), so one match
+# picks out whichever applies
+_COMPLEX_RE = re.compile(
+    r'-\((?P<neg_paren>.+)\)$'
+    r'|-\{(?P<neg_curly>[^}]+)\}$'
+    r'|\((?P<paren>.+)\)\s+AND\s+(?P<and_term>.+)$'
+)
+
+# Tokens of a space-separated term list: a quoted run (its closing quote may
+# be missing), a separating space, or unquoted text
+_TERM_TOKEN_RE = re.compile(r'"([^"]*)"?|\'([^\']*)\'?|( )|([^ "\']+)')
+
+# Anything a detector could act on: a leading '-', an opening bracket, a pipe
+# or a whitespace-delimited OR/AND
+_OPERATOR_HINT_RE = re.compile(r'^-|[|{(]|\s(?:OR|AND)\s')
+
+# Anything that needs parsing at all: an operator hint or a leading quote
+_NEEDS_PARSING_RE = re.compile(r'^["\'-]|[|{(]|\s(?:OR|AND)\s')
+
+
+# Whitespace-delimited operators with a term on each side, for values that
+# have no quotes or brackets to respect
+_OPERATOR_SPLIT_RES = {
+    operator: re.compile(r'(?<=\S)\s+' + operator + r'\s+(?=\S)')
+    for operator in ('OR', 'AND')
+}
+_NESTING_RE = re.compile(r'["(){}]')
+
+# Fields that can contain search patterns, in processing order
+_SEARCH_FIELDS = ('from', 'to', 'subject', 'has', 'does_not_have')
+_SEARCH_FIELD_SET = frozenset(_SEARCH_FIELDS)
+
+# Distinct search strings remembered per OperatorInference instance
+_CACHE_SIZE = 4096
+
+
+def _copy_operators(result: Union[str, Dict, List]) -> Union[str, Dict, List]:
+    """Copy an operator structure, so cached results are never shared."""
+    if isinstance(result, dict):
+        return {key: _copy_operators(value) for key, value in result.items()}
+    if isinstance(result, list):
+        return [_copy_operators(item) for item in result]
+    return result
+
+
+def _split_top_level(value: str, operator: str) -> List[str]:
+    """
+    Split a search string on a whitespace-delimited boolean operator.
+    
+    Operators inside double quotes, parentheses or braces don't split, so
+    "(a OR b) OR c" yields ['(a OR b)', 'c']. If the quotes or brackets are
+    unbalanced, every occurrence of the operator splits instead.
+    
+    Args:
+        value: Search string to split
+        operator: Operator keyword, e.g. 'OR' or 'AND'
+        
+    Returns:
+        Stripped terms, or [value] if the operator doesn't occur
+    """
+    if not _NESTING_RE.search(value):
+        # Nothing to respect, so split in one C-level pass
+        terms = _OPERATOR_SPLIT_RES[operator].split(value)
+        return [term.strip() for term in terms] if len(terms) > 1 else [value]
+    
+    for nested in (True, False):
+        terms = []
+        start = 0
+        depth = 0
+        in_quotes = False
+        balanced = True
+        length = len(value)
+        i = 0
+        while i < length:
+            char = value[i]
+            if nested and in_quotes:
+                in_quotes = char != '"'
+            elif nested and char == '"':
+                in_quotes = True
+            elif nested and char in '({':
+                depth += 1
+            elif nested and char in ')}':
+                if depth:
+                    depth -= 1
+                else:
+                    balanced = False
+            elif depth == 0 and char.isspace() and value[start:i].strip():
+                # Find the end of the whitespace run, then the operator and
+                # the start of the next term
+                j = i + 1
+                while j < length and value[j].isspace():
+                    j += 1
+                end = j + len(operator)
+                if end < length and value[end].isspace() and value.startswith(operator, j):
+                    k = end + 1
+                    while k < length and value[k].isspace():
+                        k += 1
+                    if k < length:
+                        terms.append(value[start:i].strip())
+                        start = i = k
+                        continue
+            i += 1
+        
+        if not nested or (balanced and depth == 0 and not in_quotes):
+            break
+    
+    if not terms:
+        return [value]
+    terms.append(value[start:].strip())
+    return terms
+
+
+def _is_parenthesized(value: str) -> bool:
+    """
+    Check whether a search string is one parenthesized group, e.g.
+    "(a OR b)" but not "(a) OR (b)".
+    """
+    if value[:1] != '(' or value[-1:] != ')':
+        return False
+    depth = 0
+    in_quotes = False
+    for i, char in enumerate(value):
+        if in_quotes:
+            in_quotes = char != '"'
+        elif char == '"':
+            in_quotes = True
+        elif char == '(':
+            depth += 1
+        elif char == ')':
+            depth -= 1
+            if depth == 0:
+                return i == len(value) - 1
+    return False
+
+
 class OperatorInference:
     """Infers YAML operators from Gmail search patterns."""
     
@@ -21,8 +160,10 @@ class OperatorInference:
             verbose: Whether to print detailed inference information
         """
         self.verbose = verbose
+        self._cache: Dict[str, Union[str, Dict]] = {}
     
-    def _strip_quotes(self, value: str) -> str:
+    @staticmethod
+    def _strip_quotes(value: str) -> str:
         """
         Strip surrounding quotes from a string if present.
         Gmail uses quotes for exact phrase matching, but we don't need them in YAML.
@@ -33,11 +174,9 @@ class OperatorInference:
         Returns:
             String with quotes removed if they were surrounding the entire value
         """
-        if len(value) >= 2:
-            # Check for matching quotes at start and end
-            if (value.startswith('"') and value.endswith('"')) or \
-               (value.startswith("'") and value.endswith("'")):
-                return value[1:-1]
+        # Check for matching quotes at start and end
+        if len(value) >= 2 and value[0] in '"\'' and value[-1] == value[0]:
+            return value[1:-1]
         return value
         
     def infer_operators(self, filter_dict: Dict) -> Dict:
@@ -48,44 +187,38 @@ class OperatorInference:
             filter_dict: Filter dictionary to process
             
         Returns:
-            Modified filter with inferred operators
+            Modified copy of the filter with inferred operators, or the
+            filter itself if nothing was inferred
         """
-        # Fields that can contain search patterns
-        search_fields = ['from', 'to', 'subject', 'has', 'does_not_have']
-        
-        modified = filter_dict.copy()
-        
-        for field in search_fields:
-            if field in modified:
-                value = modified[field]
+        if _SEARCH_FIELD_SET.isdisjoint(filter_dict):
+            return filter_dict
+        
+        # Copied on the first change, so unchanged filters cost no allocation
+        modified = None
+        
+        for field in _SEARCH_FIELDS:
+            if field in filter_dict:
+                value = filter_dict[field]
+                is_list = isinstance(value, list)
+                if not is_list and not isinstance(value, str):
+                    continue
                 
-                # Process string values
-                if isinstance(value, str):
-                    result = self._process_search_string(value, field)
-                    if result != value:  # Something was inferred
-                        modified[field] = result
-                        if self.verbose:
-                            print(f"  Inferred operators in {field}: {value} -> {result}")
+                # Scalars are handled as one-element lists (lists are already
+                # partially processed), so both take the same path
+                values = value if is_list else [value]
+                processed = [
+                    self._process_search_string(item, field) if isinstance(item, str) else item
+                    for item in values
+                ]
                 
-                # Process list values (already partially processed)
-                elif isinstance(value, list):
-                    new_list = []
-                    changed = False
-                    for item in value:
-                        if isinstance(item, str):
-                            result = self._process_search_string(item, field)
-                            new_list.append(result)
-                            if result != item:
-                                changed = True
-                        else:
-                            new_list.append(item)
-                    
-                    if changed:
-                        modified[field] = new_list
-                        if self.verbose:
-                            print(f"  Inferred operators in {field} list")
-        
-        return modified
+                if processed != values:  # Something was inferred
+                    if modified is None:
+                        modified = filter_dict.copy()
+                    modified[field] = processed if is_list else processed[0]
+                    if self.verbose:
+                        print(f"  Inferred operators in {field}: {value} -> {modified[field]}")
+        
+        return filter_dict if modified is None else modified
     
     def _process_search_string(self, value: str, field: str) -> Union[str, Dict]:
         """
@@ -95,6 +228,31 @@ class OperatorInference:
             value: The search string to process
             field: The field name (for context)
             
+        Returns:
+            Original string or operator structure
+        """
+        # Plain values (most addresses and subjects) can't match any pattern
+        # and have no quotes to strip
+        if not _NEEDS_PARSING_RE.search(value):
+            return value
+        
+        # The same values (and OR/AND terms) recur across filters, so results
+        # are memoized; callers get a copy they're free to modify
+        try:
+            result = self._cache[value]
+        except KeyError:
+            if len(self._cache) >= _CACHE_SIZE:
+                self._cache.clear()
+            result = self._cache[value] = self._infer_search_string(value)
+        return _copy_operators(result)
+    
+    def _infer_search_string(self, value: str) -> Union[str, Dict]:
+        """
+        Detect and convert operators in a search string, without memoization.
+        
+        Args:
+            value: The search string to process
+            
         Returns:
             Original string or operator structure
         """
@@ -122,8 +280,13 @@ class OperatorInference:
         if and_result:
             return and_result
         
-        # No patterns detected, strip quotes and return
-        return self._strip_quotes(value)
+        # No patterns detected, strip quotes and return; a quoted phrase
+        # that would read as operators once unquoted (an exact '"a OR b"'
+        # rather than a choice of a or b) keeps its quotes
+        unquoted = self._strip_quotes(value)
+        if unquoted != value and _OPERATOR_HINT_RE.search(unquoted):
+            return value
+        return unquoted
     
     def _detect_or_pattern(self, value: str) -> Optional[Dict]:
         """
@@ -138,41 +301,19 @@ class OperatorInference:
         Returns:
             'any' operator structure or None
         """
-        # Check if the entire expression is wrapped in parentheses
-        # e.g., "(term1 OR term2 OR term3)"
-        stripped_value = value
-        if value.startswith('(') and value.endswith(')'):
-            # Check if these are matching outer parentheses (not part of terms)
-            # by ensuring balanced parentheses when we remove them
-            inner = value[1:-1]
-            if ' OR ' in inner:
-                # Use the inner content for OR processing
-                stripped_value = inner
-        
-        # Pattern 1: Explicit OR
+        # Pattern 1: Explicit OR, outside any quotes or brackets
         # Examples: "alice OR bob", "alice@example.com OR bob@example.com"
-        or_pattern = r'^(.+?)\s+OR\s+(.+)$'
-        match = re.match(or_pattern, stripped_value)
-        if match:
-            terms = [match.group(1).strip(), match.group(2).strip()]
-            # Check for additional ORs
-            while ' OR ' in terms[-1]:
-                parts = terms[-1].split(' OR ', 1)
-                terms[-1] = parts[0].strip()
-                terms.append(parts[1].strip())
-            
-            # Strip quotes from each term
-            terms = [self._strip_quotes(t) for t in terms]
-            
-            # Process each term recursively
-            processed_terms = [self._process_search_string(t, '') for t in terms]
-            return {'any': processed_terms}
+        terms = _split_top_level(value, 'OR')
+        if len(terms) == 1 and _is_parenthesized(value):
+            # The entire expression is wrapped in parentheses
+            # e.g., "(term1 OR term2 OR term3)"
+            terms = _split_top_level(value[1:-1], 'OR')
+        if len(terms) > 1:
+            return {'any': self._process_terms(terms)}
         
         # Pattern 2: Curly braces (Gmail's OR shorthand)
         # Example: "{alice bob charlie}"
-        # Use original value, not stripped_value for other patterns
-        curly_pattern = r'^\{([^}]+)\}$'
-        match = re.match(curly_pattern, value)
+        match = _CURLY_RE.match(value)
         if match:
             # Split by whitespace, handling quoted strings
             content = match.group(1)
@@ -182,13 +323,38 @@ class OperatorInference:
         
         # Pattern 3: Pipe separator
         # Example: "alice|bob|charlie"
-        if '|' in value and not value.startswith('|') and not value.endswith('|'):
+        if '|' in value and value[0] != '|' and value[-1] != '|':
             terms = [t.strip() for t in value.split('|') if t.strip()]
             if len(terms) > 1:
                 return {'any': terms}
         
         return None
     
+    def _process_terms(self, terms: List[str]) -> List[Union[str, Dict]]:
+        """
+        Process the terms of an OR/AND expression.
+        
+        Quoted phrases are unquoted and kept literally; other terms are
+        processed recursively for nested operators.
+        
+        Args:
+            terms: Terms split from the expression
+            
+        Returns:
+            List of processed terms
+        """
+        processed_terms = []
+        for term in terms:
+            if len(term) >= 2 and term[0] in '"\'' and term[-1] == term[0]:
+                # Quoted phrase (as in _strip_quotes)
+                processed_terms.append(term[1:-1])
+            elif _OPERATOR_HINT_RE.search(term):
+                processed_terms.append(self._process_search_string(term, ''))
+            else:
+                # Leaf terms, the vast majority, are finished without recursing
+                processed_terms.append(term)
+        return processed_terms
+    
     def _detect_and_pattern(self, value: str) -> Optional[Dict]:
         """
         Detect and convert AND patterns.
@@ -201,40 +367,19 @@ class OperatorInference:
         Returns:
             'all' operator structure or None
         """
-        # Check if the entire expression is wrapped in parentheses
-        # e.g., "(term1 AND term2 AND term3)"
-        stripped_value = value
-        if value.startswith('(') and value.endswith(')'):
-            # Check if these are matching outer parentheses (not part of terms)
-            inner = value[1:-1]
-            if ' AND ' in inner:
-                # Use the inner content for AND processing
-                stripped_value = inner
-        
-        # Pattern 1: Explicit AND
+        # Pattern 1: Explicit AND, outside any quotes or brackets
         # Example: "alice AND bob"
-        and_pattern = r'^(.+?)\s+AND\s+(.+)$'
-        match = re.match(and_pattern, stripped_value)
-        if match:
-            terms = [match.group(1).strip(), match.group(2).strip()]
-            # Check for additional ANDs
-            while ' AND ' in terms[-1]:
-                parts = terms[-1].split(' AND ', 1)
-                terms[-1] = parts[0].strip()
-                terms.append(parts[1].strip())
-            
-            # Strip quotes from each term
-            terms = [self._strip_quotes(t) for t in terms]
-            
-            # Process each term recursively
-            processed_terms = [self._process_search_string(t, '') for t in terms]
-            return {'all': processed_terms}
+        terms = _split_top_level(value, 'AND')
+        if len(terms) == 1 and _is_parenthesized(value):
+            # The entire expression is wrapped in parentheses
+            # e.g., "(term1 AND term2 AND term3)"
+            terms = _split_top_level(value[1:-1], 'AND')
+        if len(terms) > 1:
+            return {'all': self._process_terms(terms)}
         
         # Pattern 2: Parentheses with implicit AND
         # Example: "(term1 term2 term3)" - all must match
-        # Use original value, not stripped_value for this pattern
-        paren_pattern = r'^\(([^)]+)\)$'
-        match = re.match(paren_pattern, value)
+        match = _PAREN_RE.match(value)
         if match:
             content = match.group(1)
             # Only convert if there are multiple terms without OR
@@ -259,17 +404,21 @@ class OperatorInference:
         """
         # Pattern: Leading minus
         # Examples: "-alice", "-newsletter", "-{spam promotions}", '-"exact phrase"'
-        if value.startswith('-') and len(value) > 1:
+        if len(value) > 1 and value[0] == '-':
             negated_term = value[1:].strip()
             
             # Strip quotes from the negated term if it's not going to be further processed
             # Check if it's a simple negation (no operators)
             if not (' OR ' in negated_term or ' AND ' in negated_term or 
-                    negated_term.startswith('{') or negated_term.startswith('(')):
+                    negated_term[:1] in ('{', '(')):
                 negated_term = self._strip_quotes(negated_term)
             
-            # Process the negated term for nested operators
-            processed = self._process_search_string(negated_term, '')
+            # Process the negated term for nested operators; simple negations
+            # like "-unsubscribe" are finished without recursing
+            if _OPERATOR_HINT_RE.search(negated_term):
+                processed = self._process_search_string(negated_term, '')
+            else:
+                processed = self._strip_quotes(negated_term)
             
             return {'not': processed}
         
@@ -287,12 +436,14 @@ class OperatorInference:
         Returns:
             Nested operator structure or None
         """
+        match = _COMPLEX_RE.match(value)
+        if not match:
+            return None
+        
         # Pattern 1: Negated parenthetical OR group
         # Example: "-(error OR warning OR failure)" -> not: {any: [error, warning, failure]}
-        neg_paren_pattern = r'^-\((.+)\)$'
-        match = re.match(neg_paren_pattern, value)
-        if match:
-            inner_content = match.group(1)
+        inner_content = match.group('neg_paren')
+        if inner_content is not None:
             # Check if it's an OR pattern
             if ' OR ' in inner_content:
                 or_result = self._detect_or_pattern(inner_content)
@@ -303,33 +454,29 @@ class OperatorInference:
         
         # Pattern 2: Negated curly braces
         # Example: "-{spam ads}" -> not: {any: [spam, ads]}
-        neg_curly_pattern = r'^-\{([^}]+)\}$'
-        match = re.match(neg_curly_pattern, value)
-        if match:
-            terms = self._split_terms(match.group(1))
+        curly_content = match.group('neg_curly')
+        if curly_content is not None:
+            terms = self._split_terms(curly_content)
             if len(terms) > 1:
                 return {'not': {'any': terms}}
+            return None
         
         # Pattern 3: Parenthetical OR followed by AND
         # Example: "(bug OR issue) AND fixed" -> all: [{any: [bug, issue]}, fixed]
-        paren_or_and_pattern = r'^\((.+)\)\s+AND\s+(.+)$'
-        match = re.match(paren_or_and_pattern, value)
-        if match:
-            paren_content = match.group(1)
-            and_term = match.group(2).strip()
-            
-            # Process the parenthetical part
-            if ' OR ' in paren_content:
-                or_result = self._detect_or_pattern(paren_content)
-                if or_result:
-                    return {'all': [or_result, and_term]}
-            
-            # Just parentheses without OR, treat as single term
-            return {'all': [paren_content, and_term]}
+        paren_content = match.group('paren')
+        and_term = match.group('and_term').strip()
         
-        return None
+        # Process the parenthetical part
+        if ' OR ' in paren_content:
+            or_result = self._detect_or_pattern(paren_content)
+            if or_result:
+                return {'all': [or_result, and_term]}
+        
+        # Just parentheses without OR, treat as single term
+        return {'all': [paren_content, and_term]}
     
-    def _split_terms(self, content: str) -> List[str]:
+    @staticmethod
+    def _split_terms(content: str) -> List[str]:
         """
         Split a string into terms, respecting quoted strings.
         
@@ -339,27 +486,19 @@ class OperatorInference:
         Returns:
             List of terms
         """
-        terms = []
+        if '"' not in content and "'" not in content:
+            # Nothing to respect, so split in C
+            return [term for term in content.split(' ') if term]
+        
+        terms: List[str] = []
         current_term = ''
-        in_quotes = False
-        quote_char = None
-        
-        for char in content:
-            if char in '"\'':
-                if not in_quotes:
-                    in_quotes = True
-                    quote_char = char
-                elif char == quote_char:
-                    in_quotes = False
-                    quote_char = None
-                else:
-                    current_term += char
-            elif char == ' ' and not in_quotes:
+        for double_quoted, single_quoted, space, text in _TERM_TOKEN_RE.findall(content):
+            if space:
                 if current_term:
                     terms.append(current_term)
                     current_term = ''
             else:
-                current_term += char
+                current_term += double_quoted or single_quoted or text
         
         if current_term:
             terms.append(current_term)
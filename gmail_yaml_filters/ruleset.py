@@ -634,33 +634,70 @@ class RuleSet(object):
         return ruleset
 
 
+FEED_NSMAP = {
+    None: "http://www.w3.org/2005/Atom",
+    "apps": "http://schemas.google.com/apps/2006",
+}
+APPS_PROPERTY = "{http://schemas.google.com/apps/2006}property"
+
+
+def _entry_children(rule):
+    """
+    Yields (tag, attributes, text) for each child of a rule's <entry> element.
+    """
+    yield "category", {"term": "filter"}, None
+    yield "title", {}, "Mail Filter"
+    yield "id", {}, "tag:mail.google.com,2008:filter:{0}".format(abs(hash(rule)))
+    yield "updated", {}, datetime.now().replace(microsecond=0).isoformat() + "Z"
+    yield "content", {}, None
+    for construct in sorted(rule.flatten().values(), key=attrgetter("key")):
+        yield APPS_PROPERTY, {"name": construct.key, "value": str(construct.value)}, None
+
+
 def ruleset_to_etree(ruleset):
-    xml = etree.Element(
-        "feed",
-        nsmap={
-            None: "http://www.w3.org/2005/Atom",
-            "apps": "http://schemas.google.com/apps/2006",
-        },
-    )
+    xml = etree.Element("feed", nsmap=FEED_NSMAP)
     etree.SubElement(xml, "title").text = "Mail Filters"
     for rule in ruleset:
         if not rule.publishable:
             continue
         entry = etree.SubElement(xml, "entry")
-        etree.SubElement(entry, "category", term="filter")
-        etree.SubElement(entry, "title").text = "Mail Filter"
-        etree.SubElement(entry, "id").text = (
-            "tag:mail.google.com,2008:filter:{0}".format(abs(hash(rule)))
-        )
-        etree.SubElement(entry, "updated").text = (
-            datetime.now().replace(microsecond=0).isoformat() + "Z"
-        )
-        etree.SubElement(entry, "content")
-        for construct in sorted(rule.flatten().values(), key=attrgetter("key")):
-            etree.SubElement(
-                entry,
-                "{http://schemas.google.com/apps/2006}property",
-                name=construct.key,
-                value=str(construct.value),
-            )
+        for tag, attrib, text in _entry_children(rule):
+            etree.SubElement(entry, tag, attrib).text = text
     return xml
+
+
+def write_ruleset_xml(ruleset, out, pretty_print=True):
+    """
+    Streams a RuleSet (or any iterable of Rules) as Gmail XML to a binary file
+    object, one entry at a time, without building the whole document in memory
+    first. Returns the number of entries written.
+
+    Each entry is serialized inside a feed of its own and written without that
+    feed's start and end, so the output is byte-for-byte what serializing
+    ruleset_to_etree() gives, namespace prefixes and empty elements included.
+    """
+    feed = etree.Element("feed", nsmap=FEED_NSMAP)
+    etree.SubElement(feed, "title").text = "Mail Filters"
+
+    def serialize():
+        return etree.tostring(
+            feed, encoding="utf8", pretty_print=pretty_print, xml_declaration=True
+        )
+
+    # Everything up to the entries, and the feed's closing tag after them
+    head, tail = serialize().rsplit(b"</feed>", 1)
+    tail = b"</feed>" + tail
+
+    written = 0
+    out.write(head)
+    for rule in ruleset:
+        if not rule.publishable:
+            continue
+        entry = etree.SubElement(feed, "entry")
+        for tag, attrib, text in _entry_children(rule):
+            etree.SubElement(entry, tag, attrib).text = text
+        out.write(serialize()[len(head):-len(tail)])
+        feed.remove(entry)
+        written += 1
+    out.write(tail)
+    return written
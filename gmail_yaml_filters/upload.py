@@ -172,6 +172,78 @@ class GmailFilters(object):
         ]
 
 
+# Gmail rejects batches of more than 50 requests
+MAX_BATCH_SIZE = 50
+
+
+class BatchedRequests(object):
+    """
+    Executes Gmail API requests, grouping up to ``batch_size`` of them into
+    each HTTP round trip. A ``batch_size`` of 1 executes each request as it
+    is added.
+
+    See https://developers.google.com/gmail/api/guides/batch
+    """
+
+    def __init__(self, gmail, batch_size=1, continue_on_http_error=False):
+        self.gmail = gmail
+        self.batch_size = max(1, min(batch_size, MAX_BATCH_SIZE))
+        self.continue_on_http_error = continue_on_http_error
+        self.batch = None
+        self.pending = 0
+        self.errors = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        # Requests already queued are still sent if the caller's loop was
+        # interrupted; a failure sending them is reported, but doesn't
+        # replace the exception that interrupted the loop
+        if exc_type is None:
+            self.flush()
+            return
+        try:
+            self.flush()
+        except googleapiclient.errors.HttpError as error:
+            print("Error sending queued requests: {}".format(error), file=sys.stderr)
+
+    def _on_response(self, request_id, response, exception):
+        # Raising here would skip the callbacks for the rest of the batch,
+        # so errors are raised once the whole batch has been executed
+        if exception is not None and not self.continue_on_http_error:
+            self.errors.append(exception)
+
+    def add(self, request):
+        if self.batch_size == 1:
+            try:
+                request.execute()
+            except googleapiclient.errors.HttpError:
+                if not self.continue_on_http_error:
+                    raise
+            return
+
+        if self.batch is None:
+            self.batch = self.gmail.new_batch_http_request(callback=self._on_response)
+        self.batch.add(request)
+        self.pending += 1
+        if self.pending >= self.batch_size:
+            self.flush()
+
+    def flush(self):
+        if self.batch is not None:
+            batch, self.batch, self.pending = self.batch, None, 0
+            batch.execute()
+            errors, self.errors = self.errors, []
+            if errors:
+                if len(errors) > 1:
+                    print(
+                        "{} more requests in the batch failed".format(len(errors) - 1),
+                        file=sys.stderr,
+                    )
+                raise errors[0]
+
+
 def rule_to_resource(rule, labels):
     actions = _rule_to_actions(rule)
 
@@ -187,36 +259,37 @@ def rule_to_resource(rule, labels):
     }
 
 
-def upload_ruleset(ruleset, service=None, dry_run=False):
+def upload_ruleset(ruleset, service=None, dry_run=False, batch_size=1):
     service = service or get_gmail_service()
     known_labels = GmailLabels(service, dry_run=dry_run)
     known_filters = GmailFilters(service)
 
-    for rule in ruleset:
-        if not rule.publishable:
-            continue
-
-        # See https://developers.google.com/gmail/api/v1/reference/users/settings/filters#resource
-        filter_data = rule_to_resource(rule, known_labels)
-
-        if not known_filters.exists(filter_data):
-            filter_data["action"] = dict(filter_data["action"])
-            filter_data["criteria"] = dict(filter_data["criteria"])
-            print(
-                "Creating",
-                filter_data["criteria"],
-                filter_data["action"],
-                file=sys.stderr,
-            )
-            # Strip out defaultdict and set; they won't be JSON-serializable
-            request = (
-                service.users()
-                .settings()
-                .filters()
-                .create(userId="me", body=filter_data)
-            )
-            if not dry_run:
-                request.execute()
+    with BatchedRequests(service, batch_size) as requests:
+        for rule in ruleset:
+            if not rule.publishable:
+                continue
+
+            # See https://developers.google.com/gmail/api/v1/reference/users/settings/filters#resource
+            filter_data = rule_to_resource(rule, known_labels)
+
+            if not known_filters.exists(filter_data):
+                filter_data["action"] = dict(filter_data["action"])
+                filter_data["criteria"] = dict(filter_data["criteria"])
+                print(
+                    "Creating",
+                    filter_data["criteria"],
+                    filter_data["action"],
+                    file=sys.stderr,
+                )
+                # Strip out defaultdict and set; they won't be JSON-serializable
+                request = (
+                    service.users()
+                    .settings()
+                    .filters()
+                    .create(userId="me", body=filter_data)
+                )
+                if not dry_run:
+                    requests.add(request)
 
 
 def find_filters_not_in_ruleset(ruleset, service, dry_run):
@@ -228,22 +301,28 @@ def find_filters_not_in_ruleset(ruleset, service, dry_run):
         yield prunable_filter
 
 
-def prune_filters_not_in_ruleset(ruleset, service, dry_run=False):
+def prune_filters_not_in_ruleset(ruleset, service, dry_run=False, batch_size=1):
     prunable_filters = find_filters_not_in_ruleset(ruleset, service, dry_run)
-    for prunable_filter in prunable_filters:
-        print("Deleting", prunable_filter, file=sys.stderr)
-        request = (
-            service.users()
-            .settings()
-            .filters()
-            .delete(userId="me", id=prunable_filter["id"])
-        )
-        if not dry_run:
-            request.execute()
+    with BatchedRequests(service, batch_size) as requests:
+        for prunable_filter in prunable_filters:
+            print("Deleting", prunable_filter, file=sys.stderr)
+            request = (
+                service.users()
+                .settings()
+                .filters()
+                .delete(userId="me", id=prunable_filter["id"])
+            )
+            if not dry_run:
+                requests.add(request)
 
 
 def prune_labels_not_in_ruleset(
-    ruleset, service, match=None, dry_run=False, continue_on_http_error=False
+    ruleset,
+    service,
+    match=None,
+    dry_run=False,
+    continue_on_http_error=False,
+    batch_size=1,
 ):
     known_labels = GmailLabels(service, dry_run=dry_run)
     ruleset_filters = [rule_to_resource(rule, known_labels) for rule in ruleset]
@@ -263,20 +342,19 @@ def prune_labels_not_in_ruleset(
         and (match is None or match(label["name"]))
     ]
 
-    for unused_label in sorted(unused_labels, key=itemgetter("name")):
-        print(
-            "Deleting label",
-            unused_label["name"],
-            "({})".format(unused_label["id"]),
-            file=sys.stderr,
-        )
-        request = service.users().labels().delete(userId="me", id=unused_label["id"])
-        if not dry_run:
-            try:
-                request.execute()
-            except googleapiclient.errors.HttpError:
-                if not continue_on_http_error:
-                    raise
+    with BatchedRequests(service, batch_size, continue_on_http_error) as requests:
+        for unused_label in sorted(unused_labels, key=itemgetter("name")):
+            print(
+                "Deleting label",
+                unused_label["name"],
+                "({})".format(unused_label["id"]),
+                file=sys.stderr,
+            )
+            request = service.users().labels().delete(
+                userId="me", id=unused_label["id"]
+            )
+            if not dry_run:
+                requests.add(request)
 
 
 def get_gmail_service(credentials):
@@ -6,21 +6,110 @@ Bidirectional Gmail XML ↔ YAML converter with perfect round-trip preservation.
 from __future__ import print_function, unicode_literals
 
 import sys
-from typing import Dict, List, Optional, Tuple, Union, Any
+from collections import Counter
+from copy import deepcopy
+from functools import lru_cache
+from itertools import product
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple, Union, Any
 from pathlib import Path
+from types import MappingProxyType
 
 import yaml
 from lxml import etree
 
+try:
+    # libyaml-backed loader and dumper; much faster on large filter files
+    from yaml import CSafeLoader as YAMLLoader, CSafeDumper as YAMLDumper
+except ImportError:  # pragma: no cover
+    from yaml import SafeLoader as YAMLLoader, SafeDumper as YAMLDumper
+
 from .inference_safety import InferenceSafety
 from .operator_inference import OperatorInference
 
 
+# Gmail exports are indentation-heavy and never rely on comments, IDs or
+# entities, so skip building nodes for them
+_XML_PARSER_OPTIONS = dict(
+    remove_blank_text=True,
+    remove_comments=True,
+    collect_ids=False,
+    resolve_entities=False,
+    huge_tree=False,
+)
+_XML_PARSER = etree.XMLParser(**_XML_PARSER_OPTIONS)
+
+# Gmail exports use the Atom namespace, with filter criteria and actions as
+# apps:property elements; tags are spelled out once, in Clark notation, so
+# entries and properties are found by tag rather than through XPath
+_ATOM_NS = 'http://www.w3.org/2005/Atom'
+_APPS_NS = 'http://schemas.google.com/apps/2006'
+_ATOM_ENTRY = f'{{{_ATOM_NS}}}entry'
+_APPS_PROPERTY = f'{{{_APPS_NS}}}property'
+
+# Every generated filter entry starts out the same, so each is copied from
+# this template rather than assembled element by element
+_ENTRY_TEMPLATE = etree.Element('entry')
+etree.SubElement(_ENTRY_TEMPLATE, 'category', term='filter')
+etree.SubElement(_ENTRY_TEMPLATE, 'title').text = 'Mail Filter'
+etree.SubElement(_ENTRY_TEMPLATE, 'content')
+_SIZE_PROPERTY_PATH = f".//{_APPS_PROPERTY}[@name='size']"
+
+
+@lru_cache(maxsize=1024)
+def _and_terms(search: str) -> frozenset:
+    """
+    Return the unquoted terms of a parenthesized AND search, e.g.
+    '(urgent AND "team meeting")' -> {'urgent', 'team meeting'}.
+    
+    Other searches have no terms. Cached, since a filter's 'has' value is
+    compared with every candidate parent during hierarchy inference.
+    """
+    if search.startswith('(') and ' AND ' in search:
+        return frozenset(part.strip() for part in search.strip('()').replace('"', '').split(' AND '))
+    return frozenset()
+
+
+def parse_xml(source: Union[str, Path]) -> etree._ElementTree:
+    """Parse an XML file with the shared filter-export parser."""
+    return etree.parse(str(source), _XML_PARSER)
+
+
+def _is_xml_file(xml_input: Any) -> bool:
+    """
+    Whether an XML input names a file, rather than holding XML or a tree.
+    
+    Decided by type alone: XML text always starts with '<' (after any byte
+    order mark), so any other string is taken to be a path, with no need to
+    stat it first.
+    """
+    if isinstance(xml_input, Path):
+        return True
+    return isinstance(xml_input, str) and not xml_input.lstrip('\ufeff').lstrip().startswith('<')
+
+
+def _is_existing_path(source: Any) -> bool:
+    """Whether an input names an existing file, rather than holding content."""
+    if not isinstance(source, (str, Path)):
+        return False
+    try:
+        return Path(source).exists()
+    except (OSError, ValueError):
+        # Content too long (or otherwise unfit) to be a file name
+        return False
+
+
 class GmailFilterConverter:
     """Converts between Gmail XML filter exports and gmail-yaml-filters YAML format."""
     
-    # Bidirectional property mappings (XML → YAML)
-    XML_TO_YAML_MAP = {
+    __slots__ = (
+        'preserve_raw', 'smart_clean', 'verbose', 'strict', 'merge_filters',
+        'infer_more', 'infer_strategy', 'infer_operators', 'safety_analyzer',
+        'operator_inference', 'warnings', 'stats',
+    )
+    
+    # Bidirectional property mappings (XML → YAML), read-only like the
+    # property sets below since lookup tables are derived from them
+    XML_TO_YAML_MAP = MappingProxyType({
         'from': 'from',
         'to': 'to',
         'subject': 'subject',
@@ -37,10 +126,10 @@ class GmailFilterConverter:
         'shouldStar': 'star',
         'shouldTrash': 'trash',
         'forwardTo': 'forward',
-    }
+    })
     
     # Reverse mapping (YAML → XML)
-    YAML_TO_XML_MAP = {
+    YAML_TO_XML_MAP = MappingProxyType({
         'from': 'from',
         'to': 'to',
         'subject': 'subject',
@@ -56,29 +145,59 @@ class GmailFilterConverter:
         'star': 'shouldStar',
         'trash': 'shouldTrash',
         'forward': 'forwardTo',
-    }
+    })
     
-    # Properties that should be converted to boolean
-    BOOLEAN_PROPERTIES = {
+    # Properties that should be converted to boolean (frozen, like the
+    # Gmail-only set, since both are folded into the lookup table below)
+    BOOLEAN_PROPERTIES = frozenset({
         'shouldArchive', 'shouldMarkAsImportant', 'shouldAlwaysMarkAsImportant',
         'shouldDelete', 'shouldMarkAsRead', 'shouldNeverMarkAsImportant', 
         'shouldNeverSpam', 'shouldStar', 'shouldTrash'
-    }
+    })
     
     # Gmail-specific properties to preserve in _gmail_raw
-    GMAIL_ONLY_PROPERTIES = {
+    GMAIL_ONLY_PROPERTIES = frozenset({
         'size', 'sizeOperator', 'sizeUnit', 'smartLabelToApply',
         'excludeChats', 'hasAttachment', 'category', 'title', 
         'id', 'updated', 'content'
+    })
+    
+    # XML property name -> (YAML key, whether its value is boolean), so each
+    # property needs a single lookup during conversion; Gmail-only and
+    # unknown properties are both missing, and both go to _gmail_raw
+    _XML_PROPERTY_TARGETS = {
+        name: (yaml_key, is_boolean)
+        for name, yaml_key, is_boolean, is_gmail_only in zip(
+            XML_TO_YAML_MAP,
+            XML_TO_YAML_MAP.values(),
+            map(BOOLEAN_PROPERTIES.__contains__, XML_TO_YAML_MAP),
+            map(GMAIL_ONLY_PROPERTIES.__contains__, XML_TO_YAML_MAP),
+        )
+        if not is_gmail_only
     }
     
+    # Boolean property values: how they're written, and every casing of
+    # 'true' accepted when reading (a set lookup rather than a lower() copy)
+    _BOOLEAN_STRINGS = {True: 'true', False: 'false'}
+    _TRUE_STRINGS = frozenset(map(''.join, product(*zip('true', 'TRUE'))))
+    
     # Properties to clean when smart_clean is enabled
-    CLEANABLE_DEFAULTS = {
-        ('sizeOperator', 's_sl'),
-        ('sizeUnit', 's_smb'),
-        ('excludeChats', 'false'),
-        ('hasAttachment', 'false'),
-    }
+    CLEANABLE_DEFAULTS = MappingProxyType({
+        'sizeOperator': 's_sl',
+        'sizeUnit': 's_smb',
+        'excludeChats': 'false',
+        'hasAttachment': 'false',
+    })
+    
+    # YAML keys that filter emails (as opposed to actions), for telling a
+    # filter's conditions apart when inferring "more" structures
+    _CONDITION_KEYS = frozenset(
+        {'from', 'to', 'cc', 'bcc', 'subject', 'has', 'does_not_have',
+         'list', 'has_attachment', 'filename', 'category', 'size',
+         'larger', 'smaller', 'rfc822msgid', 'deliveredto', 'is'}
+        | set(XML_TO_YAML_MAP.values())
+    ) - {'label', 'archive', 'delete', 'read', 'star', 'important',
+         'not_important', 'not_spam', 'trash', 'forward', '_gmail_raw'}
     
     def __init__(self, preserve_raw: bool = True, smart_clean: bool = False,
                  verbose: bool = False, strict: bool = False, merge_filters: bool = False,
@@ -105,7 +224,10 @@ class GmailFilterConverter:
         self.infer_more = infer_more
         self.infer_strategy = infer_strategy
         self.infer_operators = infer_operators
-        self.safety_analyzer = InferenceSafety(verbose=verbose) if infer_more else None
+        self.safety_analyzer = InferenceSafety(
+            verbose=verbose,
+            collect_all_warnings=(infer_strategy == 'interactive'),
+        ) if infer_more else None
         self.operator_inference = OperatorInference(verbose=verbose) if infer_operators else None
         self.warnings = []
         self.stats = {
@@ -119,42 +241,18 @@ class GmailFilterConverter:
             'round_trip_valid': None
         }
     
-    def xml_to_yaml(self, xml_input: Union[str, Path], yaml_output: Optional[Union[str, Path]] = None) -> List[Dict]:
+    def xml_to_yaml(self, xml_input: Union[str, Path, bytes, etree._Element], yaml_output: Optional[Union[str, Path]] = None) -> List[Dict]:
         """
         Convert Gmail XML to YAML dict structure.
         
         Args:
-            xml_input: Path to XML file or XML string
+            xml_input: Path to XML file, XML string, or already-parsed XML
             yaml_output: Optional path to write YAML file
             
         Returns:
             List of filter dictionaries
         """
-        # Parse XML
-        if isinstance(xml_input, (str, Path)) and Path(xml_input).exists():
-            with open(xml_input, 'rb') as f:
-                xml_content = f.read()
-        else:
-            xml_content = xml_input.encode('utf-8') if isinstance(xml_input, str) else xml_input
-        
-        try:
-            root = etree.fromstring(xml_content)
-        except etree.XMLSyntaxError as e:
-            raise ValueError(f"Invalid XML: {e}")
-        
-        # Gmail uses Atom namespace
-        ns = {'atom': 'http://www.w3.org/2005/Atom',
-              'apps': 'http://schemas.google.com/apps/2006'}
-        
-        filters = []
-        entries = root.xpath('//atom:entry', namespaces=ns)
-        self.stats['total_filters'] = len(entries)
-        
-        for i, entry in enumerate(entries):
-            filter_dict = self._convert_xml_entry(entry, ns, filter_index=i)
-            if filter_dict:
-                filters.append(filter_dict)
-                self.stats['converted_filters'] += 1
+        filters = list(self.iter_xml_to_yaml(xml_input))
         
         # Merge filters if requested
         if self.merge_filters:
@@ -170,24 +268,50 @@ class GmailFilterConverter:
         
         return filters
     
-    def yaml_to_xml(self, yaml_input: Union[List, Dict, str, Path], xml_output: Optional[Union[str, Path]] = None) -> str:
+    def iter_xml_to_yaml(self, xml_input: Union[str, Path, bytes, etree._Element]) -> Iterator[Dict]:
+        """
+        Convert Gmail XML to filter dictionaries one entry at a time.
+        
+        Unlike xml_to_yaml, filters are never merged or combined into "more"
+        structures, so none of them have to be held in memory together.
+        
+        Args:
+            xml_input: Path to XML file, XML string, or already-parsed XML
+            
+        Yields:
+            Filter dictionaries
+        """
+        self.stats['total_filters'] = 0
+        
+        for i, entry in enumerate(self._iter_entries(xml_input)):
+            self.stats['total_filters'] += 1
+            filter_dict = self._convert_xml_entry(entry, filter_index=i)
+            if filter_dict:
+                self.stats['converted_filters'] += 1
+                yield filter_dict
+    
+    def yaml_to_xml(self, yaml_input: Union[List, Dict, str, Path], xml_output: Optional[Union[str, Path]] = None,
+                    pretty_print: bool = True) -> str:
         """
         Convert YAML back to Gmail XML format.
         
         Args:
             yaml_input: YAML data (list/dict), file path, or YAML string
             xml_output: Optional path to write XML file
+            pretty_print: Indent the XML; not needed when it's only parsed again
             
         Returns:
             XML string
         """
         # Load YAML data
         if isinstance(yaml_input, (str, Path)):
-            if Path(yaml_input).exists():
-                with open(yaml_input, 'r') as f:
-                    data = yaml.safe_load(f)
+            if _is_existing_path(yaml_input):
+                # Bytes go to libyaml as they are, and YAML's own encoding
+                # detection applies rather than the locale's
+                with open(yaml_input, 'rb') as f:
+                    data = yaml.load(f, Loader=YAMLLoader)
             else:
-                data = yaml.safe_load(yaml_input)
+                data = yaml.load(yaml_input, Loader=YAMLLoader)
         else:
             data = yaml_input
         
@@ -200,25 +324,28 @@ class GmailFilterConverter:
             filters = [data]
         
         # Create XML structure
-        xml_str = self._create_gmail_xml(filters)
+        xml_bytes = self._create_gmail_xml(filters, pretty_print)
         
-        # Write to file if output specified
+        # Write to file if output specified, as serialized
         if xml_output:
-            with open(xml_output, 'w', encoding='utf-8') as f:
-                f.write(xml_str)
+            with open(xml_output, 'wb') as f:
+                f.write(xml_bytes)
         
-        return xml_str
+        return xml_bytes.decode('utf-8')
     
-    def validate_round_trip(self, xml_input: Union[str, Path]) -> bool:
+    def validate_round_trip(self, xml_input: Union[str, Path, bytes, etree._Element]) -> bool:
         """
         Verify that XML → YAML → XML preserves all data.
         
         Args:
-            xml_input: Path to XML file or XML string
+            xml_input: Path to XML file, XML string, or already-parsed XML
             
         Returns:
             True if round-trip preserves all data (or successfully converts when merging)
         """
+        # Parse the source once; both the conversion and the comparison use it
+        xml_input = self._load_xml_root(xml_input)
+        
         # Convert XML to YAML
         yaml_data = self.xml_to_yaml(xml_input)
         
@@ -227,7 +354,7 @@ class GmailFilterConverter:
         if self.merge_filters or self.infer_more:
             try:
                 # Convert back to XML - this tests that the merged structure is valid
-                restored_xml = self.yaml_to_xml(yaml_data)
+                restored_xml = self._create_gmail_xml(yaml_data, pretty_print=False)
                 
                 # Parse to ensure it's valid XML
                 restored_filters = self._parse_xml_filters(restored_xml)
@@ -246,7 +373,7 @@ class GmailFilterConverter:
         
         # Normal round-trip validation without merging
         # Convert back to XML
-        restored_xml = self.yaml_to_xml(yaml_data)
+        restored_xml = self._create_gmail_xml(yaml_data, pretty_print=False)
         
         # Parse both XML documents
         original_filters = self._parse_xml_filters(xml_input)
@@ -265,20 +392,25 @@ class GmailFilterConverter:
         
         return is_valid
     
-    def _convert_xml_entry(self, entry, ns: Dict, filter_index: int = 0) -> Optional[Dict]:
+    def _convert_xml_entry(self, entry, filter_index: int = 0) -> Optional[Dict]:
         """Convert a single XML entry to a filter dictionary."""
         filter_dict = {}
         gmail_raw = {}
         
-        properties = entry.xpath('.//apps:property', namespaces=ns)
+        # Whether this filter has an actual size property (for smart
+        # cleaning); only looked up once a size operator turns up
+        has_size_property = None
         
-        # Check if this filter has actual size property (for smart cleaning)
-        has_size_property = any(
-            prop.get('name') == 'size' 
-            for prop in properties
-        )
+        # Settings, tables and counts used for every property, kept local to
+        # the loop; the counts are added to the stats once at the end
+        smart_clean = self.smart_clean
+        preserve_raw = self.preserve_raw
+        get_target = self._XML_PROPERTY_TARGETS.get
+        get_default = self.CLEANABLE_DEFAULTS.get
+        true_strings = self._TRUE_STRINGS
+        cleaned = preserved = 0
         
-        for prop in properties:
+        for prop in entry.iter(_APPS_PROPERTY):
             name = prop.get('name')
             value = prop.get('value', '')
             
@@ -286,30 +418,27 @@ class GmailFilterConverter:
                 continue
             
             # Smart cleaning
-            if self.smart_clean:
+            if smart_clean:
                 # Skip meaningless size operators without actual size
-                if not has_size_property and name in ['sizeOperator', 'sizeUnit']:
-                    self.stats['properties_cleaned'] += 1
-                    continue
+                if name in ('sizeOperator', 'sizeUnit'):
+                    if has_size_property is None:
+                        has_size_property = entry.find(_SIZE_PROPERTY_PATH) is not None
+                    if not has_size_property:
+                        cleaned += 1
+                        continue
                 
                 # Skip default values
-                if (name, value) in self.CLEANABLE_DEFAULTS:
-                    self.stats['properties_cleaned'] += 1
+                if get_default(name) == value:
+                    cleaned += 1
                     continue
             
-            # Check if it's a Gmail-only property
-            if name in self.GMAIL_ONLY_PROPERTIES:
-                if self.preserve_raw:
-                    gmail_raw[name] = value
-                    self.stats['gmail_properties_preserved'] += 1
-                continue
-            
             # Map to YAML property
-            yaml_key = self.XML_TO_YAML_MAP.get(name)
-            if yaml_key:
+            target = get_target(name)
+            if target:
+                yaml_key, is_boolean = target
                 # Convert boolean values
-                if name in self.BOOLEAN_PROPERTIES:
-                    value = value.lower() == 'true'
+                if is_boolean:
+                    value = value in true_strings
                 
                 # Handle multiple labels
                 if yaml_key == 'label' and yaml_key in filter_dict:
@@ -318,13 +447,16 @@ class GmailFilterConverter:
                     filter_dict[yaml_key].append(value)
                 else:
                     filter_dict[yaml_key] = value
-            elif self.preserve_raw:
-                # Unknown property - preserve in raw
+            elif preserve_raw:
+                # Gmail-only or unknown property - preserve in raw
                 gmail_raw[name] = value
-                self.stats['gmail_properties_preserved'] += 1
+                preserved += 1
+        
+        self.stats['properties_cleaned'] += cleaned
+        self.stats['gmail_properties_preserved'] += preserved
         
         # Add gmail_raw if we have any preserved properties
-        if gmail_raw and self.preserve_raw:
+        if gmail_raw and preserve_raw:
             filter_dict['_gmail_raw'] = gmail_raw
         
         # Apply operator inference if enabled
@@ -389,12 +521,12 @@ class GmailFilterConverter:
             # Single label or no label - add as is
             flattened.append(filter_dict)
     
-    def _create_gmail_xml(self, filters: List[Dict]) -> str:
-        """Create Gmail XML from filter dictionaries."""
+    def _create_gmail_xml(self, filters: List[Dict], pretty_print: bool = True) -> bytes:
+        """Create UTF-8 encoded Gmail XML from filter dictionaries."""
         # Create root element with namespaces
         ns_map = {
-            None: 'http://www.w3.org/2005/Atom',
-            'apps': 'http://schemas.google.com/apps/2006'
+            None: _ATOM_NS,
+            'apps': _APPS_NS,
         }
         root = etree.Element('feed', nsmap=ns_map)
         
@@ -405,60 +537,54 @@ class GmailFilterConverter:
         # First, flatten any "more" structures and expand multiple labels
         flattened_filters = self._flatten_filters_for_xml(filters)
         
+        # Looked up for every property, so kept local to the loop; most
+        # values (addresses, search terms, labels) are already strings and
+        # go straight into the element, the rest are converted first
+        get_xml_key = self.YAML_TO_XML_MAP.get
+        xml_value = self._xml_value
+        sub_element = etree.SubElement
+        
         # Add each filter as an entry
         for filter_dict in flattened_filters:
-            entry = etree.SubElement(root, 'entry')
-            
-            # Add category
-            category = etree.SubElement(entry, 'category')
-            category.set('term', 'filter')
-            
-            # Add title
-            entry_title = etree.SubElement(entry, 'title')
-            entry_title.text = 'Mail Filter'
+            # Category, title and (empty) content come from the template
+            entry = deepcopy(_ENTRY_TEMPLATE)
+            root.append(entry)
             
-            # Add content (empty)
-            content = etree.SubElement(entry, 'content')
-            
-            # Process standard properties
+            # Process standard properties ('_gmail_raw' and 'more' aren't in
+            # the map, so they're skipped along with any other unknown key)
             for yaml_key, value in filter_dict.items():
-                if yaml_key == '_gmail_raw' or yaml_key == 'more':
-                    continue
-                
-                xml_key = self.YAML_TO_XML_MAP.get(yaml_key)
+                xml_key = get_xml_key(yaml_key)
                 if xml_key:
                     # Labels should already be single values after flattening
-                    self._add_property(entry, xml_key, value, ns_map)
+                    if not isinstance(value, str):
+                        value = xml_value(value)
+                    sub_element(entry, _APPS_PROPERTY, {'name': xml_key, 'value': value})
             
             # Add preserved Gmail properties
             if '_gmail_raw' in filter_dict:
                 for name, value in filter_dict['_gmail_raw'].items():
-                    self._add_property(entry, name, value, ns_map)
+                    if not isinstance(value, str):
+                        value = xml_value(value)
+                    sub_element(entry, _APPS_PROPERTY, {'name': name, 'value': value})
         
-        # Convert to string
-        xml_bytes = etree.tostring(
+        # Serialize
+        return etree.tostring(
             root,
             encoding='utf-8',
-            pretty_print=True,
+            pretty_print=pretty_print,
             xml_declaration=True
         )
-        return xml_bytes.decode('utf-8')
     
-    def _add_property(self, entry, name: str, value: Any, ns_map: Dict):
-        """Add a property to an XML entry."""
-        prop = etree.SubElement(entry, '{http://schemas.google.com/apps/2006}property')
-        prop.set('name', name)
-        
-        # Convert boolean to string
+    def _xml_value(self, value: Any) -> str:
+        """Convert a non-string property value to its XML attribute string."""
         if isinstance(value, bool):
-            value = 'true' if value else 'false'
-        elif value is None:
-            value = ''
-        elif isinstance(value, dict):
+            return self._BOOLEAN_STRINGS[value]
+        if value is None:
+            return ''
+        if isinstance(value, dict):
             # Handle operator dictionaries - convert back to Gmail search syntax
-            value = self._operator_dict_to_string(value)
-        
-        prop.set('value', str(value))
+            return self._operator_dict_to_string(value)
+        return str(value)
     
     def _operator_dict_to_string(self, op_dict: Dict) -> str:
         """
@@ -563,18 +689,34 @@ class GmailFilterConverter:
         indexed_filters = [(i, f, self._get_filter_conditions(f)) for i, f in enumerate(filters)]
         indexed_filters.sort(key=lambda x: len(x[2]))
         
+        # Group positions in the sorted list by their set of condition keys.
+        # A child needs every parent condition plus at least one more, so only
+        # groups whose keys are a proper superset of the parent's can hold
+        # children; those have more conditions, so they all sort after it
+        positions_by_keys = {}
+        for position, (_, _, conditions) in enumerate(indexed_filters):
+            positions_by_keys.setdefault(frozenset(conditions), []).append(position)
+        
         # For interactive mode, we need to handle user decisions
         skip_all_similar = False
         accept_all_similar = False
         
-        for i, (parent_idx, parent_filter, parent_conditions) in enumerate(indexed_filters):
+        for parent_idx, parent_filter, parent_conditions in indexed_filters:
             if parent_idx in used_indices:
                 continue
             
             children = []
+            parent_keys = frozenset(parent_conditions)
+            candidates = sorted(
+                position
+                for keys, positions in positions_by_keys.items()
+                if parent_keys < keys
+                for position in positions
+            )
             
             # Look for potential children (filters that have all parent conditions plus more)
-            for child_idx, child_filter, child_conditions in indexed_filters[i+1:]:
+            for position in candidates:
+                child_idx, child_filter, child_conditions = indexed_filters[position]
                 if child_idx in used_indices:
                     continue
                 
@@ -600,8 +742,8 @@ class GmailFilterConverter:
                         children.append(child_idx)
                         used_indices.add(child_idx)
                 else:
-                    # Non-interactive modes use _is_child_of which includes safety checks
-                    if self._is_child_of(parent_filter, child_filter, parent_conditions, child_conditions):
+                    # Non-interactive modes add safety checks to the basic check above
+                    if self._merge_is_safe(parent_filter, child_filter):
                         children.append(child_idx)
                         if self.infer_strategy == 'aggressive':
                             used_indices.add(child_idx)
@@ -720,7 +862,7 @@ class GmailFilterConverter:
             return self._interactive_merge_decision(parent, child, skip_all, accept_all)
         
         # Remember the decision for similar patterns
-        pattern_key = self.safety_analyzer.create_pattern_key(parent, child)
+        pattern_key = safety_analysis['pattern_key']
         
         if response in ['y', 'yes']:
             self.safety_analyzer.remember_decision(pattern_key, 'yes')
@@ -739,44 +881,22 @@ class GmailFilterConverter:
         """
         Extract only the condition fields from a filter (not actions).
         """
-        # Conditions are fields that filter emails
-        condition_keys = {'from', 'to', 'cc', 'bcc', 'subject', 'has', 'does_not_have', 
-                         'list', 'has_attachment', 'filename', 'category', 'size',
-                         'larger', 'smaller', 'rfc822msgid', 'deliveredto', 'is'}
-        
-        conditions = {}
-        for key, value in filter_dict.items():
-            if key in condition_keys or key in self.XML_TO_YAML_MAP.values():
-                # Check if it's a condition by checking against known conditions
-                if key not in {'label', 'archive', 'delete', 'read', 'star', 'important',
-                              'not_important', 'not_spam', 'trash', 'forward', '_gmail_raw'}:
-                    conditions[key] = value
-        
-        return conditions
+        condition_keys = self._CONDITION_KEYS
+        return {key: value for key, value in filter_dict.items() if key in condition_keys}
     
     def _is_child_of(self, parent: Dict, child: Dict, parent_conditions: Dict, child_conditions: Dict) -> bool:
         """
         Determine if child filter could be a child of parent filter in a "more" structure.
         """
-        # Child must have all parent conditions
-        for key, parent_value in parent_conditions.items():
-            if key not in child_conditions:
-                return False
-            
-            child_value = child_conditions[key]
-            
-            # For 'has' fields, check if child extends parent
-            if key == 'has':
-                if not self._has_value_extends(parent_value, child_value):
-                    return False
-            # For other fields, must be identical
-            elif parent_value != child_value:
-                return False
-        
-        # Child must have at least one additional condition
-        if len(child_conditions) <= len(parent_conditions):
+        if not self._basic_child_check(parent, child, parent_conditions, child_conditions):
             return False
         
+        return self._merge_is_safe(parent, child)
+    
+    def _merge_is_safe(self, parent: Dict, child: Dict) -> bool:
+        """
+        Apply the strategy's safety checks to a child that passed _basic_child_check.
+        """
         # Apply safety analysis if we have a safety analyzer
         if self.safety_analyzer and self.infer_strategy != 'interactive':
             safety_analysis = self.safety_analyzer.analyze_merge_safety(parent, child)
@@ -823,17 +943,8 @@ class GmailFilterConverter:
         if parent_value in child_value:
             return True
         
-        # Check for AND pattern: (parent AND something)
-        if child_value.startswith('(') and ' AND ' in child_value:
-            # Remove parentheses and quotes
-            child_clean = child_value.strip('()').replace('"', '')
-            parent_clean = parent_value.replace('"', '')
-            
-            # Split by AND and check if parent is one of the parts
-            parts = [p.strip() for p in child_clean.split(' AND ')]
-            return parent_clean in parts
-        
-        return False
+        # Check for AND pattern: (parent AND something), parent unquoted
+        return parent_value.replace('"', '') in _and_terms(child_value)
     
     def _build_more_structures(self, hierarchies: List[Dict], filters: List[Dict]) -> List[Dict]:
         """
@@ -850,13 +961,15 @@ class GmailFilterConverter:
             # Get parent filter
             parent = filters[parent_idx].copy()
             
+            # Conditions every child inherits from the parent
+            parent_conditions = self._get_filter_conditions(parent)
+            
             # Build "more" list from children
             more_list = []
             for child_idx in children_indices:
                 child = filters[child_idx].copy()
                 
                 # Remove parent conditions from child (they're inherited)
-                parent_conditions = self._get_filter_conditions(parent)
                 for key in parent_conditions:
                     if key in child:
                         # For 'has', remove parent part if it's AND'd
@@ -1045,40 +1158,102 @@ class GmailFilterConverter:
     
     def _write_yaml(self, filters: List[Dict], output_path: Union[str, Path]):
         """Write filters to YAML file."""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            # Add header comment
-            f.write("# Gmail filters converted from XML\n")
-            f.write("# Use gmail-yaml-to-xml to convert back for Gmail import\n\n")
-            
-            # Write filters
+        with open(output_path, 'wb') as f:
+            self.dump_yaml(filters, f)
+    
+    @staticmethod
+    def dump_yaml(filters: Iterable[Dict], stream) -> None:
+        """
+        Write filters as UTF-8 encoded YAML to a binary stream.
+        
+        Each filter is written as soon as it's produced, so filters can be
+        streamed straight from iter_xml_to_yaml.
+        
+        Args:
+            filters: Filter dictionaries, as returned by xml_to_yaml
+            stream: Binary file-like object to write to
+        """
+        # Add header comment
+        stream.write(b"# Gmail filters converted from XML\n")
+        stream.write(b"# Use gmail-yaml-to-xml to convert back for Gmail import\n\n")
+        
+        # Write filters; one-item lists concatenate into the same block list
+        # a single dump would produce
+        written = False
+        for filter_dict in filters:
             yaml.dump(
-                filters,
-                f,
+                [filter_dict],
+                stream,
+                Dumper=YAMLDumper,
+                encoding='utf-8',
                 default_flow_style=False,
                 allow_unicode=True,
                 sort_keys=False
             )
+            written = True
+        if not written:
+            stream.write(b"[]\n")
     
-    def _parse_xml_filters(self, xml_input: Union[str, Path, bytes]) -> List[Dict]:
-        """Parse XML and return list of filter properties."""
-        if isinstance(xml_input, bytes):
-            xml_content = xml_input
-        elif isinstance(xml_input, Path) or (isinstance(xml_input, str) and len(xml_input) < 500 and Path(xml_input).exists()):
-            # It's a file path
-            with open(xml_input, 'rb') as f:
-                xml_content = f.read()
-        else:
-            # It's XML string content
+    @staticmethod
+    def _load_xml_root(xml_input: Union[str, Path, bytes, etree._Element]) -> etree._Element:
+        """
+        Return the root element for an XML file path, XML string or bytes.
+        
+        Already-parsed elements and element trees are returned without
+        re-parsing.
+        """
+        if isinstance(xml_input, etree._ElementTree):
+            return xml_input.getroot()
+        if etree.iselement(xml_input):
+            return xml_input
+        
+        try:
+            if _is_xml_file(xml_input):
+                return parse_xml(xml_input).getroot()
             xml_content = xml_input.encode('utf-8') if isinstance(xml_input, str) else xml_input
+            return etree.fromstring(xml_content, _XML_PARSER)
+        except etree.XMLSyntaxError as e:
+            raise ValueError(f"Invalid XML: {e}")
+    
+    @classmethod
+    def _iter_entries(cls, xml_input: Union[str, Path, bytes, etree._Element]) -> Iterator[etree._Element]:
+        """
+        Yield the filter entries of an XML file path, XML string or bytes.
         
-        root = etree.fromstring(xml_content)
-        ns = {'atom': 'http://www.w3.org/2005/Atom',
-              'apps': 'http://schemas.google.com/apps/2006'}
+        Files are parsed incrementally and each entry is discarded once the
+        caller has moved on, so large exports never sit in memory as a whole.
+        Other inputs are parsed (if necessary) and searched as usual.
+        """
+        if not _is_xml_file(xml_input):
+            yield from cls._load_xml_root(xml_input).iter(_ATOM_ENTRY)
+            return
+        
+        entries = etree.iterparse(
+            str(xml_input),
+            events=('end',),
+            tag=_ATOM_ENTRY,
+            **_XML_PARSER_OPTIONS
+        )
+        try:
+            for _, entry in entries:
+                yield entry
+                # Drop the entry and everything parsed before it
+                entry.clear(keep_tail=True)
+                parent = entry.getparent()
+                if parent is not None:
+                    while entry.getprevious() is not None:
+                        del parent[0]
+        except etree.XMLSyntaxError as e:
+            raise ValueError(f"Invalid XML: {e}")
+    
+    def _parse_xml_filters(self, xml_input: Union[str, Path, bytes, etree._Element]) -> List[Dict]:
+        """Parse XML and return list of filter properties."""
+        root = self._load_xml_root(xml_input)
         
         filters = []
-        for entry in root.xpath('//atom:entry', namespaces=ns):
+        for entry in root.iter(_ATOM_ENTRY):
             filter_props = {}
-            for prop in entry.xpath('.//apps:property', namespaces=ns):
+            for prop in entry.iter(_APPS_PROPERTY):
                 name = prop.get('name')
                 value = prop.get('value', '')
                 if name:
@@ -1094,36 +1269,27 @@ class GmailFilterConverter:
         
         return filters
     
+    @staticmethod
+    def _canonical_key(filter_props: Dict) -> frozenset:
+        """
+        Return a hashable form of parsed filter properties.
+        
+        Property order doesn't matter, and neither does the order of a
+        repeated property's values (lists), which become sorted tuples.
+        """
+        return frozenset(
+            (name, tuple(sorted(value))) if isinstance(value, list) else (name, value)
+            for name, value in filter_props.items()
+        )
+    
     def _filters_are_equivalent(self, filters1: List[Dict], filters2: List[Dict]) -> bool:
         """Check if two sets of filters are equivalent."""
         if len(filters1) != len(filters2):
             return False
         
-        # Sort filters for comparison (order doesn't matter)
-        def filter_key(f):
-            return str(sorted(f.items()))
-        
-        sorted1 = sorted(filters1, key=filter_key)
-        sorted2 = sorted(filters2, key=filter_key)
-        
-        for f1, f2 in zip(sorted1, sorted2):
-            if set(f1.keys()) != set(f2.keys()):
-                return False
-            
-            for key in f1.keys():
-                v1 = f1[key]
-                v2 = f2[key]
-                
-                # Normalize for comparison
-                if isinstance(v1, list):
-                    v1 = sorted(v1)
-                if isinstance(v2, list):
-                    v2 = sorted(v2)
-                
-                if v1 != v2:
-                    return False
-        
-        return True
+        # Compare as multisets of canonical forms (filter order doesn't matter)
+        return (Counter(map(self._canonical_key, filters1))
+                == Counter(map(self._canonical_key, filters2)))
     
     def _report_differences(self, original: List[Dict], restored: List[Dict]):
         """Report differences between filter sets."""
@@ -1135,18 +1301,21 @@ class GmailFilterConverter:
             if o != r:
                 print(f"\nFilter {i+1} differs:", file=sys.stderr)
                 
+                # Key views support set operations directly
+                original_keys, restored_keys = o.keys(), r.keys()
+                
                 # Missing keys
-                missing_in_restored = set(o.keys()) - set(r.keys())
+                missing_in_restored = original_keys - restored_keys
                 if missing_in_restored:
                     print(f"  Missing in restored: {missing_in_restored}", file=sys.stderr)
                 
                 # Extra keys
-                extra_in_restored = set(r.keys()) - set(o.keys())
+                extra_in_restored = restored_keys - original_keys
                 if extra_in_restored:
                     print(f"  Extra in restored: {extra_in_restored}", file=sys.stderr)
                 
                 # Different values
-                for key in set(o.keys()) & set(r.keys()):
+                for key in original_keys & restored_keys:
                     if o[key] != r[key]:
                         print(f"  {key}: '{o[key]}' → '{r[key]}'", file=sys.stderr)
     
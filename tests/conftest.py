@@ -0,0 +1,14 @@
+"""
+Shared fixtures for the test suite.
+"""
+
+import pytest
+
+
+@pytest.fixture(autouse=True)
+def isolated_cache(tmp_path, monkeypatch):
+    """
+    Keeps the parsed-YAML cache in a per-test directory rather than the
+    user's ~/.cache, since commands cache by default.
+    """
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
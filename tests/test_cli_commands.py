@@ -39,6 +39,29 @@ class TestCLICommands:
         assert args.input_file == 'test.xml'
         assert args.output == 'output.yaml'
     
+    def test_create_parser_is_reused(self):
+        """Test the cached parser handles back-to-back invocations independently."""
+        parser = create_parser()
+        assert create_parser() is parser
+        
+        first = parser.parse_args(['sync', '--dry-run', 'a.yaml'])
+        second = parser.parse_args(['export', 'b.yaml'])
+        assert (first.command, first.yaml_file, first.dry_run) == ('sync', 'a.yaml', True)
+        assert (second.command, second.yaml_file) == ('export', 'b.yaml')
+        assert not hasattr(second, 'dry_run')
+    
+    def test_parse_batch_size(self):
+        """Test --batch-size defaults to Gmail's limit and rejects larger batches."""
+        parser = create_parser()
+        assert parser.parse_args(['sync', 'test.yaml']).batch_size == 50
+        assert parser.parse_args(['prune', '--batch-size', '10', 'test.yaml']).batch_size == 10
+        
+        with patch('sys.stderr', new_callable=StringIO):
+            with pytest.raises(SystemExit):
+                parser.parse_args(['upload', '--batch-size', '51', 'test.yaml'])
+            with pytest.raises(SystemExit):
+                parser.parse_args(['upload', '--batch-size', '0', 'test.yaml'])
+    
     def test_cmd_export_to_stdout(self):
         """Test export command output to stdout."""
         with tempfile.NamedTemporaryFile(mode='w', suffix='.yaml', delete=False) as f:
@@ -94,6 +117,22 @@ class TestCLICommands:
             if os.path.exists(xml_file):
                 os.unlink(xml_file)
     
+    def test_cmd_export_multiple_files(self, tmp_path):
+        """Test export combines several YAML files into one XML document."""
+        first = tmp_path / "first.yaml"
+        first.write_text("- from: alice@example.com\n  label: Alice\n")
+        second = tmp_path / "second.yaml"
+        second.write_text("- from: bob@example.com\n  label: Bob\n")
+        
+        args = create_parser().parse_args(['export', '--no-cache', str(first), str(second)])
+        with patch('sys.stdout', new_callable=StringIO) as mock_stdout:
+            cmd_export(args)
+            output = mock_stdout.getvalue()
+        
+        assert output.count('<?xml version') == 1
+        assert 'alice@example.com' in output
+        assert 'bob@example.com' in output
+    
     def test_cmd_convert_xml_to_yaml(self):
         """Test convert command from XML to YAML."""
         xml_content = '''<?xml version='1.0' encoding='UTF-8'?>
@@ -232,8 +271,8 @@ class TestCLICommands:
             os.unlink(xml_file)
     
     @patch('gmail_yaml_filters.main.get_gmail_service_for_file')
-    @patch('gmail_yaml_filters.main.prune_filters_not_in_ruleset')
-    @patch('gmail_yaml_filters.main.upload_ruleset')
+    @patch('gmail_yaml_filters.upload.prune_filters_not_in_ruleset')
+    @patch('gmail_yaml_filters.upload.upload_ruleset')
     def test_cmd_sync(self, mock_upload, mock_prune, mock_get_service):
         """Test sync command."""
         yaml_content = """
@@ -265,7 +304,7 @@ class TestCLICommands:
             os.unlink(yaml_file)
     
     @patch('gmail_yaml_filters.main.get_gmail_service_for_file')
-    @patch('gmail_yaml_filters.main.upload_ruleset')
+    @patch('gmail_yaml_filters.upload.upload_ruleset')
     def test_cmd_upload(self, mock_upload, mock_get_service):
         """Test upload command."""
         yaml_content = """
@@ -295,7 +334,7 @@ class TestCLICommands:
             os.unlink(yaml_file)
     
     @patch('gmail_yaml_filters.main.get_gmail_service_for_file')
-    @patch('gmail_yaml_filters.main.prune_filters_not_in_ruleset')
+    @patch('gmail_yaml_filters.upload.prune_filters_not_in_ruleset')
     def test_cmd_prune(self, mock_prune, mock_get_service):
         """Test prune command."""
         yaml_content = """
@@ -373,6 +412,15 @@ class TestCLICommands:
         finally:
             os.unlink(yaml_file)
     
+    def test_offline_commands_do_not_import_gmail_client(self):
+        """Test importing the CLI doesn't load the Google API client."""
+        import subprocess
+        code = (
+            "import sys, gmail_yaml_filters.main; "
+            "sys.exit('gmail_yaml_filters.upload' in sys.modules)"
+        )
+        assert subprocess.call([sys.executable, '-c', code]) == 0
+    
     def test_main_help(self):
         """Test main function help output."""
         with patch('sys.argv', ['gmail-yaml-filters', '--help']):
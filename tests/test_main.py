@@ -1,9 +1,15 @@
-from io import StringIO
+from io import BytesIO, StringIO, TextIOWrapper
+import argparse
+import os
 import sys
+import threading
 
 import pytest
+import yaml
 
-from gmail_yaml_filters.main import load_yaml_filters
+from gmail_yaml_filters.main import (
+    YAMLLoader, cmd_export, detect_file_format, label_matcher, load_yaml_filters, load_yaml_rules,
+)
 from gmail_yaml_filters.ruleset import RuleSet
 
 
@@ -28,6 +34,14 @@ def test_load_yaml_from_stdin(monkeypatch):
     assert len(ruleset.rules) == 1
 
 
+def test_load_yaml_from_stdin_bytes(monkeypatch):
+    # stdin's text encoding is bypassed in favour of the raw UTF-8 bytes
+    stdin = TextIOWrapper(BytesIO("- from: 🐶\n  archive: true".encode("utf-8")), encoding="ascii")
+    monkeypatch.setattr("sys.stdin", stdin)
+    ruleset = load_yaml_filters("-")
+    assert len(ruleset.rules) == 1
+
+
 def test_load_yaml_from_filename(tmpconfig):
     ruleset = load_yaml_filters(str(tmpconfig))
     assert isinstance(ruleset, RuleSet)
@@ -55,3 +69,135 @@ def test_load_yaml_ignores_rules_with_ignore_flag(tmp_path):
     )
     ruleset = load_yaml_filters(str(fpath))
     assert len(ruleset.rules) == 1  # Only one rule, the ignored one is filtered out
+
+
+@pytest.mark.parametrize(
+    "content,expected",
+    [
+        ("<?xml version='1.0'?>\n<feed/>", "xml"),
+        ("\ufeff  <feed/>", "xml"),
+        ("---\n- has: attachment", "yaml"),
+        ("- has: attachment\n  archive: true", "yaml"),
+        ("# my filters\n- to: alice", "yaml"),
+        ("has: attachment\narchive: true", "yaml"),
+    ],
+)
+def test_detect_file_format_from_content(tmp_path, content, expected):
+    fpath = tmp_path / "filters"
+    fpath.write_text(content, encoding="utf-8")
+    assert detect_file_format(str(fpath)) == expected
+
+
+@pytest.mark.skipif(not yaml.__with_libyaml__, reason="PyYAML built without libyaml")
+def test_yaml_loader_uses_libyaml():
+    assert YAMLLoader is yaml.CSafeLoader
+
+
+def test_load_yaml_uses_parse_cache(tmpconfig, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    first = load_yaml_filters(str(tmpconfig), use_cache=True)
+    cached = list((tmp_path / "cache" / "gmail-yaml-filters").glob("*.pickle"))
+    assert len(cached) == 1
+
+    # A cache hit must not need to parse YAML at all
+    monkeypatch.setattr("yaml.load_all", None)
+    second = load_yaml_filters(str(tmpconfig), use_cache=True)
+    assert len(second.rules) == len(first.rules) == 2
+
+
+def test_load_yaml_parse_cache_disabled_by_env(tmpconfig, tmp_path, monkeypatch):
+    monkeypatch.setenv("XDG_CACHE_HOME", str(tmp_path / "cache"))
+    monkeypatch.setenv("GYF_CACHE", "0")
+    load_yaml_filters(str(tmpconfig), use_cache=True)
+    assert not (tmp_path / "cache").exists()
+
+
+def test_label_matcher():
+    assert label_matcher(r".*") is None
+    match = label_matcher(r"Archive/")
+    assert match("Archive/2019")
+    assert not match("Inbox")
+
+
+def test_load_yaml_multiple_documents(tmp_path):
+    fpath = tmp_path / "multi.yaml"
+    fpath.write_text(
+        "has: attachment\n"
+        "archive: true\n"
+        "---\n"
+        "- to: alice\n"
+        "  label: foo\n"
+        "- to: bob\n"
+        "  label: bar\n"
+        "  ignore: true\n"
+        "---\n"
+    )
+    ruleset = load_yaml_filters(str(fpath))
+    assert len(ruleset.rules) == 2
+
+
+def test_load_yaml_interns_repeated_strings(tmp_path):
+    """Repeated short strings in different rules share one object."""
+    yaml_file = tmp_path / 'filters.yaml'
+    yaml_file.write_text(
+        '- from: alice@example.com\n  label: Shared Label\n'
+        '- to: bob@example.com\n  label: Shared Label\n'
+    )
+    first, second = load_yaml_rules(str(yaml_file))
+    assert first['label'] is second['label']
+
+
+def test_load_yaml_nested_rule_lists(tmp_path):
+    """Rule lists may nest; entries that aren't dicts don't break the ignore check."""
+    yaml_file = tmp_path / 'filters.yaml'
+    yaml_file.write_text(
+        '- from: alice@example.com\n  label: Alice\n'
+        '- - from: bob@example.com\n    label: Bob\n'
+        '  - from: carol@example.com\n    label: Carol\n    ignore: true\n'
+    )
+    ruleset = load_yaml_filters(str(yaml_file))
+    assert len(list(ruleset)) == 2
+
+
+@pytest.mark.parametrize('use_cache', [False, True])
+def test_load_yaml_empty_file(tmp_path, monkeypatch, use_cache):
+    """Empty files load as an empty ruleset rather than failing to map."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    yaml_file = tmp_path / 'empty.yaml'
+    yaml_file.write_bytes(b'')
+    assert list(load_yaml_rules(str(yaml_file), use_cache=use_cache)) == []
+
+
+@pytest.mark.skipif(not hasattr(os, 'mkfifo'), reason='needs named pipes')
+@pytest.mark.parametrize('no_cache', [False, True])
+def test_export_from_fifo(tmp_path, monkeypatch, capsysbinary, no_cache):
+    """Pipes can't be mapped, so they're read rather than taken as empty."""
+    monkeypatch.setenv('XDG_CACHE_HOME', str(tmp_path / 'cache'))
+    fifo = tmp_path / 'rules.yaml'
+    os.mkfifo(fifo)
+
+    def feed():
+        with open(fifo, 'wb') as f:
+            f.write(b'- from: alice@example.com\n  label: Alice\n')
+
+    writer = threading.Thread(target=feed)
+    writer.start()
+    try:
+        cmd_export(argparse.Namespace(yaml_file=str(fifo), more_yaml_files=[], output=None, no_cache=no_cache))
+    finally:
+        writer.join()
+    out = capsysbinary.readouterr().out
+    assert b'value="alice@example.com"' in out
+    assert b'value="Alice"' in out
+
+
+def test_export_invalid_rule_writes_nothing(tmp_path, capsysbinary):
+    """A bad rule fails the export before any XML reaches stdout."""
+    yaml_file = tmp_path / 'filters.yaml'
+    yaml_file.write_text(
+        '- from: alice@example.com\n  label: Alice\n'
+        '- from: bob@example.com\n  smartLabelToApply: ^smartlabel_social\n'
+    )
+    with pytest.raises(Exception, match='smartLabelToApply'):
+        cmd_export(argparse.Namespace(yaml_file=str(yaml_file), more_yaml_files=[], output=None, no_cache=True))
+    assert capsysbinary.readouterr().out == b''
@@ -2,6 +2,8 @@
 # -*- coding: utf-8 -*-
 """Tests for operator inference functionality."""
 
+from unittest.mock import patch
+
 import pytest
 from gmail_yaml_filters.operator_inference import OperatorInference
 
@@ -153,6 +155,13 @@ class TestOperatorInference:
         """Test internal quotes are preserved."""
         assert self.inference._strip_quotes('text with "internal" quotes') == 'text with "internal" quotes'
     
+    def test_quoted_phrase_with_operators_keeps_quotes(self):
+        """Test an exact phrase containing OR/AND isn't turned into operators."""
+        value = '"alice@example.com OR bob@example.com OR carol@example.com"'
+        assert self.inference._process_search_string(value, 'from') == value
+        assert self.inference._process_search_string('"fixed AND shipped"', 'subject') == '"fixed AND shipped"'
+        assert self.inference._process_search_string('"plain phrase"', 'subject') == 'plain phrase'
+    
     # ========== Process Search String Tests ==========
     
     def test_process_simple_string(self):
@@ -165,6 +174,24 @@ class TestOperatorInference:
         result = self.inference._process_search_string('"exact phrase"', "field")
         assert result == "exact phrase"
     
+    def test_process_plain_string_skips_detectors(self):
+        """Test values without operator syntax bypass the pattern detectors."""
+        with patch.object(self.inference, '_detect_complex_pattern') as detect:
+            assert self.inference._process_search_string("alice-smith@example.com", "field") == "alice-smith@example.com"
+            assert self.inference._process_search_string("ORDER ANDROID", "field") == "ORDER ANDROID"
+        detect.assert_not_called()
+    
+    def test_process_search_string_memoized(self):
+        """Test repeated values reuse the cached parse but return independent copies."""
+        first = self.inference._process_search_string("alice OR bob", "from")
+        with patch.object(self.inference, '_infer_search_string') as infer:
+            second = self.inference._process_search_string("alice OR bob", "to")
+        infer.assert_not_called()
+        assert second == first == {'any': ['alice', 'bob']}
+        
+        second['any'].append('mallory')
+        assert self.inference._process_search_string("alice OR bob", "from") == {'any': ['alice', 'bob']}
+    
     def test_process_or_pattern(self):
         """Test processing of OR pattern."""
         result = self.inference._process_search_string("alice OR bob", "field")
@@ -204,6 +231,16 @@ class TestOperatorInference:
         assert result['from'][1] == 'charlie'
         assert result['label'] == ['important', 'work']
     
+    def test_infer_operators_copies_only_on_change(self):
+        """Test unchanged filters are returned as-is and changed ones are copied."""
+        plain = {'from': 'alice@example.com', 'label': 'work'}
+        assert self.inference.infer_operators(plain) is plain
+        
+        filter_dict = {'from': 'alice OR bob', 'label': 'work'}
+        result = self.inference.infer_operators(filter_dict)
+        assert result is not filter_dict
+        assert filter_dict['from'] == 'alice OR bob'
+    
     def test_infer_operators_preserves_non_searchable_fields(self):
         """Test that non-searchable fields are preserved as-is."""
         filter_dict = {
@@ -219,6 +256,18 @@ class TestOperatorInference:
         assert result['star'] is False
         assert result['_gmail_raw'] == {'sizeOperator': 's_sl'}
     
+    def test_infer_operators_reports_only_when_verbose(self, capsys):
+        """Test inferences are printed in verbose mode and silent otherwise."""
+        filter_dict = {'from': 'alice OR bob', 'to': ['carol OR dave']}
+    
+        self.inference.infer_operators(filter_dict)
+        assert capsys.readouterr().out == ''
+    
+        OperatorInference(verbose=True).infer_operators(filter_dict)
+        out = capsys.readouterr().out
+        assert "Inferred operators in from: alice OR bob -> {'any': ['alice', 'bob']}" in out
+        assert "Inferred operators in to: ['carol OR dave'] -> [{'any': ['carol', 'dave']}]" in out
+    
     def test_edge_case_or_in_normal_text(self):
         """Test OR in normal text is not converted."""
         # This is a tricky case - "OR" in the middle of normal text
@@ -237,6 +286,23 @@ class TestOperatorInference:
         # This might not parse perfectly due to complexity
         assert result is not None  # Just ensure no crash
     
+    def test_or_pattern_respects_nesting(self):
+        """Test OR inside parentheses, braces or quotes doesn't split the outer expression."""
+        assert self.inference._detect_or_pattern("(a OR b) OR c") == {'any': [{'any': ['a', 'b']}, 'c']}
+        assert self.inference._detect_or_pattern("a OR {b c}") == {'any': ['a', {'any': ['b', 'c']}]}
+        assert self.inference._detect_or_pattern('"x OR y" OR z') == {'any': ['x OR y', 'z']}
+        assert self.inference._detect_or_pattern("(a) OR (b)") == {'any': ['(a)', '(b)']}
+    
+    def test_and_pattern_respects_nesting(self):
+        """Test AND inside parentheses doesn't split the outer expression."""
+        result = self.inference._detect_and_pattern("invoice AND (paid OR refunded)")
+        assert result == {'all': ['invoice', {'any': ['paid', 'refunded']}]}
+    
+    def test_or_pattern_with_unbalanced_quote(self):
+        """Test unbalanced quotes fall back to splitting on every OR."""
+        result = self.inference._detect_or_pattern('"unclosed OR b')
+        assert result == {'any': ['"unclosed', 'b']}
+    
     def test_real_world_healthcare_filter(self):
         """Test real-world complex healthcare filter from user data."""
         value = ("(covered.ca.gov OR donotreplyucsfmychart@ucsf.edu OR "
@@ -1,9 +1,11 @@
 # -*- coding: utf-8 -*-
 from __future__ import unicode_literals
 
+import re
 from datetime import date
 
 import pytest
+from lxml import etree
 
 from gmail_yaml_filters.ruleset import (
     InvalidIdentifier,
@@ -11,6 +13,8 @@ from gmail_yaml_filters.ruleset import (
     RuleAction,
     RuleCondition,
     RuleSet,
+    ruleset_to_etree,
+    write_ruleset_xml,
 )
 
 
@@ -269,3 +273,48 @@ def test_foreach_dict_within_nested_condition():
             )
         ],
     ]
+
+
+def test_write_ruleset_xml_matches_etree():
+    from io import BytesIO
+
+    ruleset = RuleSet.from_object(
+        [{"from": "alice@example.com", "label": "Alice"}, {"has": "attachment", "archive": True}]
+    )
+    streamed = BytesIO()
+    write_ruleset_xml(ruleset, streamed, pretty_print=False)
+    parsed = etree.fromstring(streamed.getvalue())
+    built = ruleset_to_etree(ruleset)
+    for element in (parsed, built):
+        for updated in element.iter("{*}updated"):
+            updated.text = None
+    assert etree.tostring(parsed, method="c14n") == etree.tostring(
+        etree.fromstring(etree.tostring(built)), method="c14n"
+    )
+
+
+@pytest.mark.parametrize("pretty_print", [True, False])
+def test_write_ruleset_xml_matches_etree_serialization(pretty_print):
+    from io import BytesIO
+
+    ruleset = RuleSet.from_object(
+        [{"from": "alice@example.com", "label": "Alice"}, {"has": "attachment", "archive": True}]
+    )
+    streamed = BytesIO()
+    write_ruleset_xml(ruleset, streamed, pretty_print=pretty_print)
+    serialized = etree.tostring(
+        ruleset_to_etree(ruleset), encoding="utf8", pretty_print=pretty_print, xml_declaration=True
+    )
+
+    def without_timestamps(xml):
+        return re.sub(rb"<updated>[^<]*</updated>", b"<updated/>", xml)
+
+    assert without_timestamps(streamed.getvalue()) == without_timestamps(serialized)
+    assert b'<category term="filter"/>' in streamed.getvalue()
+
+
+def test_write_ruleset_xml_counts_entries():
+    from io import BytesIO
+
+    rules = RuleSet.from_object([{"from": "alice", "archive": True}, {"from": "bob"}])
+    assert write_ruleset_xml(rules, BytesIO()) == 1
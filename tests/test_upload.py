@@ -7,9 +7,11 @@ from mock import MagicMock
 
 from gmail_yaml_filters.ruleset import RuleSet
 from gmail_yaml_filters.upload import (
+    BatchedRequests,
     GmailFilters,
     GmailLabels,
     fake_label,
+    prune_filters_not_in_ruleset,
     prune_labels_not_in_ruleset,
     upload_ruleset,
 )
@@ -137,3 +139,86 @@ def test_prune_labels_not_in_ruleset_continue_on_http_error(fake_gmail):
 
     prune_labels_not_in_ruleset(ruleset, fake_gmail, continue_on_http_error=True)
     assert fake_gmail.users().labels().delete().execute.call_count == 2
+
+
+def test_upload_batches_requests(fake_gmail):
+    ruleset = RuleSet.from_object(
+        [{"from": name, "archive": True} for name in ("alice", "bob", "carol")]
+    )
+    upload_ruleset(ruleset, fake_gmail, batch_size=2)
+    batch = fake_gmail.new_batch_http_request()
+    assert batch.add.call_count == 3
+    assert batch.execute.call_count == 2
+    assert fake_gmail.users().settings().filters().create().execute.call_count == 0
+
+
+def test_prune_filters_batches_requests(fake_gmail):
+    prune_filters_not_in_ruleset(RuleSet.from_object([]), fake_gmail, batch_size=50)
+    batch = fake_gmail.new_batch_http_request()
+    assert batch.add.call_count == 2
+    assert batch.execute.call_count == 1
+
+
+def test_batched_requests_caps_batch_size(fake_gmail):
+    assert BatchedRequests(fake_gmail, batch_size=500).batch_size == 50
+
+
+def fake_batch_responses(fake_gmail, exceptions):
+    """Make the next batch execute() call back once per exception."""
+    answered = []
+
+    def execute():
+        callback = fake_gmail.new_batch_http_request.call_args[1]["callback"]
+        for request_id, exception in enumerate(exceptions):
+            callback(str(request_id), None, exception)
+            answered.append(request_id)
+
+    fake_gmail.new_batch_http_request().execute.side_effect = execute
+    return answered
+
+
+def test_batched_requests_raises_http_error_after_batch(fake_gmail):
+    errors = [googleapiclient.errors.HttpError(MagicMock(), b"") for _ in range(2)]
+    requests = BatchedRequests(fake_gmail, batch_size=50)
+    answered = fake_batch_responses(fake_gmail, [errors[0], None, errors[1]])
+    for _ in range(3):
+        requests.add(MagicMock())
+
+    with pytest.raises(googleapiclient.errors.HttpError) as excinfo:
+        requests.flush()
+    assert excinfo.value is errors[0]
+    # Every response in the batch was handled before the error was raised
+    assert answered == [0, 1, 2]
+    assert requests.errors == []
+
+
+def test_batched_requests_continue_on_http_error(fake_gmail):
+    error = googleapiclient.errors.HttpError(MagicMock(), b"")
+    requests = BatchedRequests(fake_gmail, batch_size=50, continue_on_http_error=True)
+    answered = fake_batch_responses(fake_gmail, [error, error])
+    requests.add(MagicMock())
+    requests.add(MagicMock())
+    requests.flush()
+    assert answered == [0, 1]
+
+
+def test_batched_requests_sends_queued_requests_on_error(fake_gmail):
+    batch = fake_gmail.new_batch_http_request()
+    with pytest.raises(RuntimeError):
+        with BatchedRequests(fake_gmail, batch_size=50) as requests:
+            requests.add(MagicMock())
+            requests.add(MagicMock())
+            raise RuntimeError("interrupted")
+    assert batch.add.call_count == 2
+    assert batch.execute.call_count == 1
+
+
+def test_batched_requests_keeps_original_error_if_flush_fails(fake_gmail, capsys):
+    error = googleapiclient.errors.HttpError(MagicMock(), b"")
+    fake_batch_responses(fake_gmail, [error, error])
+    with pytest.raises(RuntimeError):
+        with BatchedRequests(fake_gmail, batch_size=50) as requests:
+            requests.add(MagicMock())
+            requests.add(MagicMock())
+            raise RuntimeError("interrupted")
+    assert "Error sending queued requests" in capsys.readouterr().err
@@ -3,7 +3,7 @@ from __future__ import unicode_literals
 
 import pytest
 
-from gmail_yaml_filters.main import ruleset_to_xml
+from gmail_yaml_filters.main import ruleset_to_xml, ruleset_to_xml_bytes
 from gmail_yaml_filters.ruleset import RuleSet
 
 NS = {"apps": "http://schemas.google.com/apps/2006"}
@@ -43,3 +43,12 @@ def test_ruleset_with_empty_rule():
     """
     xml = ruleset_to_xml(RuleSet.from_object([{"from": "alice"}]))
     assert "<entry>" not in xml
+
+
+def test_ruleset_to_xml_bytes(ruleset):
+    """
+    The bytes form is the encoded text form, without a decode round trip.
+    """
+    xml = ruleset_to_xml_bytes(ruleset, pretty_print=False)
+    assert isinstance(xml, bytes)
+    assert xml == ruleset_to_xml(ruleset, pretty_print=False).encode("utf8")
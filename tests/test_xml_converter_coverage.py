@@ -2,7 +2,10 @@
 # -*- coding: utf-8 -*-
 """Additional tests to improve xml_converter.py coverage."""
 
+import io
 import pytest
+import subprocess
+import sys
 import tempfile
 import os
 from unittest.mock import patch, MagicMock
@@ -10,7 +13,7 @@ from pathlib import Path
 import yaml
 from lxml import etree
 
-from gmail_yaml_filters.xml_converter import GmailFilterConverter
+from gmail_yaml_filters.xml_converter import GmailFilterConverter, parse_xml
 
 
 class TestXMLConverterCoverage:
@@ -81,7 +84,7 @@ class TestXMLConverterCoverage:
             prop.set('name', name)
             prop.set('value', value)
         
-        filter_dict = converter._convert_xml_entry(entry, {'apps': 'http://schemas.google.com/apps/2006'}, 0)
+        filter_dict = converter._convert_xml_entry(entry, 0)
         
         assert filter_dict['from'] == 'test@example.com'
         assert filter_dict['label'] == 'Large'
@@ -111,7 +114,7 @@ class TestXMLConverterCoverage:
             prop.set('name', name)
             prop.set('value', value)
         
-        filter_dict = converter._convert_xml_entry(entry, {'apps': 'http://schemas.google.com/apps/2006'}, 0)
+        filter_dict = converter._convert_xml_entry(entry, 0)
         
         assert filter_dict['from'] == 'test@example.com'
         assert filter_dict['forward'] == 'backup@example.com'
@@ -208,6 +211,186 @@ class TestXMLConverterCoverage:
         finally:
             os.unlink(xml_file)
     
+    def test_validate_round_trip_with_parsed_tree(self):
+        """Test round-trip validation accepts an already-parsed XML tree."""
+        root = etree.fromstring(b'''<?xml version='1.0' encoding='UTF-8'?>
+<feed xmlns='http://www.w3.org/2005/Atom' xmlns:apps='http://schemas.google.com/apps/2006'>
+    <entry>
+        <category term='filter'></category>
+        <apps:property name='from' value='test@example.com'/>
+        <apps:property name='label' value='Test'/>
+    </entry>
+</feed>''')
+        
+        converter = GmailFilterConverter()
+        assert converter.validate_round_trip(etree.ElementTree(root)) is True
+        assert converter.get_stats()['total_filters'] == 1
+    
+    def test_validate_round_trip_parses_file_once(self):
+        """Test the source file is parsed once and shared by both comparisons."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False) as f:
+            f.write('''<?xml version='1.0' encoding='UTF-8'?>
+<feed xmlns='http://www.w3.org/2005/Atom' xmlns:apps='http://schemas.google.com/apps/2006'>
+    <entry><apps:property name='from' value='test@example.com'/></entry>
+</feed>''')
+            xml_file = f.name
+        
+        try:
+            with patch('gmail_yaml_filters.xml_converter.parse_xml', wraps=parse_xml) as parse, \
+                    patch('gmail_yaml_filters.xml_converter.etree.iterparse') as iterparse:
+                assert GmailFilterConverter().validate_round_trip(xml_file) is True
+            parse.assert_called_once_with(xml_file)
+            iterparse.assert_not_called()
+        finally:
+            os.unlink(xml_file)
+    
+    def test_yaml_to_xml_without_pretty_print(self):
+        """Test unindented XML holds the same filters as the pretty version."""
+        converter = GmailFilterConverter()
+        filters = [{'from': 'a@example.com', 'label': 'A', 'archive': True}]
+        
+        compact = converter.yaml_to_xml(filters, pretty_print=False)
+        assert '\n  ' not in compact
+        assert (converter._parse_xml_filters(compact)
+                == converter._parse_xml_filters(converter.yaml_to_xml(filters)))
+    
+    def test_parse_xml_drops_whitespace_and_comments(self):
+        """Test the shared parser skips indentation and comment nodes."""
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False) as f:
+            f.write('''<?xml version='1.0' encoding='UTF-8'?>
+<feed xmlns='http://www.w3.org/2005/Atom' xmlns:apps='http://schemas.google.com/apps/2006'>
+    <!-- exported filters -->
+    <entry>
+        <apps:property name='from' value='test@example.com'/>
+    </entry>
+</feed>''')
+            xml_file = f.name
+        
+        try:
+            root = parse_xml(xml_file).getroot()
+            assert root.text is None
+            assert [child.tag for child in root] == ['{http://www.w3.org/2005/Atom}entry']
+            assert GmailFilterConverter()._parse_xml_filters(xml_file) == [{'from': 'test@example.com'}]
+        finally:
+            os.unlink(xml_file)
+    
+    def test_iter_entries_releases_file_entries(self):
+        """Test file entries are streamed and cleared once processed."""
+        xml_content = '''<?xml version='1.0' encoding='UTF-8'?>
+<feed xmlns='http://www.w3.org/2005/Atom' xmlns:apps='http://schemas.google.com/apps/2006'>
+    <title>Mail Filters</title>
+    <entry><apps:property name='from' value='a@example.com'/></entry>
+    <entry><apps:property name='from' value='b@example.com'/></entry>
+    <entry><apps:property name='from' value='c@example.com'/></entry>
+</feed>'''
+        with tempfile.NamedTemporaryFile(mode='w', suffix='.xml', delete=False) as f:
+            f.write(xml_content)
+            xml_file = f.name
+    
+        try:
+            converter = GmailFilterConverter()
+            seen = []
+            for entry in converter._iter_entries(xml_file):
+                # Only the (already cleared) previous entry is left before it
+                if seen:
+                    assert entry.getprevious() is seen[-1]
+                    assert seen[-1].getprevious() is None
+                seen.append(entry)
+            assert all(len(entry) == 0 for entry in seen)
+    
+            assert converter.xml_to_yaml(xml_file) == converter.xml_to_yaml(xml_content)
+            assert converter.get_stats()['total_filters'] == 3
+        finally:
+            os.unlink(xml_file)
+    
+    def test_parse_xml_filters_with_long_xml_string(self):
+        """Test XML content too long to be a file name is parsed as XML."""
+        xml_content = ("<feed xmlns='http://www.w3.org/2005/Atom' xmlns:apps='http://schemas.google.com/apps/2006'>"
+                       + "<entry><apps:property name='from' value='a@example.com'/></entry>" * 100
+                       + "</feed>")
+        converter = GmailFilterConverter()
+        
+        assert converter._parse_xml_filters(xml_content) == [{'from': 'a@example.com'}] * 100
+        assert len(converter.xml_to_yaml(xml_content)) == 100
+    
+    def test_filters_are_equivalent_ignores_order(self):
+        """Test filter and repeated-property order don't affect equivalence."""
+        converter = GmailFilterConverter()
+        original = [{'from': 'a', 'label': ['x', 'y']}, {'from': 'b'}, {'from': 'a', 'label': 'x'}]
+        restored = [{'from': 'a', 'label': 'x'}, {'from': 'b'}, {'label': ['y', 'x'], 'from': 'a'}]
+        
+        assert converter._filters_are_equivalent(original, restored)
+        assert not converter._filters_are_equivalent(original, restored[:2] + [{'from': 'a', 'label': 'y'}])
+        assert not converter._filters_are_equivalent(original, restored[:2])
+    
+    def test_missing_xml_file_is_not_parsed_as_xml(self):
+        """Test a string that isn't XML is read as a path, even if missing."""
+        with pytest.raises(OSError):
+            GmailFilterConverter()._parse_xml_filters('no-such-filters.xml')
+        with pytest.raises(OSError):
+            GmailFilterConverter().xml_to_yaml('no-such-filters.xml')
+    
+    def test_xml_text_with_byte_order_mark_is_parsed(self):
+        """Test XML text starting with a byte order mark isn't taken for a path."""
+        xml_text = ('\ufeff<?xml version="1.0"?>'
+                    '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:apps="http://schemas.google.com/apps/2006">'
+                    '<entry><apps:property name="from" value="alice@example.com"/></entry></feed>')
+        
+        assert GmailFilterConverter().xml_to_yaml(xml_text) == [{'from': 'alice@example.com'}]
+        assert GmailFilterConverter()._parse_xml_filters(xml_text) == [{'from': 'alice@example.com'}]
+    
+    def test_yaml_to_xml_reads_utf8_file(self):
+        """Test YAML files are read as UTF-8 whatever the locale's encoding."""
+        with tempfile.NamedTemporaryFile(mode='wb', suffix='.yaml', delete=False) as f:
+            f.write('- from: café@example.com\n  label: Résumés\n'.encode('utf-8'))
+            yaml_file = f.name
+        
+        try:
+            # An ASCII locale, without Python's UTF-8 mode
+            code = (
+                "import sys; from gmail_yaml_filters.xml_converter import GmailFilterConverter; "
+                "sys.stdout.buffer.write(GmailFilterConverter().yaml_to_xml(sys.argv[1]).encode('utf-8'))"
+            )
+            env = dict(os.environ, LC_ALL='C', LANG='C')
+            xml = subprocess.run([sys.executable, '-X', 'utf8=0', '-c', code, yaml_file],
+                                 env=env, capture_output=True, check=True).stdout
+            assert GmailFilterConverter()._parse_xml_filters(xml) == [{'from': 'café@example.com', 'label': 'Résumés'}]
+        finally:
+            os.unlink(yaml_file)
+    
+    def test_dump_yaml_streams_filters(self):
+        """Test filters streamed from iter_xml_to_yaml dump like the full list."""
+        xml_content = '''<feed xmlns='http://www.w3.org/2005/Atom' xmlns:apps='http://schemas.google.com/apps/2006'>
+    <entry><apps:property name='from' value='a@example.com'/><apps:property name='label' value='A'/></entry>
+    <entry><apps:property name='from' value='b@example.com'/><apps:property name='shouldStar' value='true'/></entry>
+</feed>'''
+        converter = GmailFilterConverter()
+        
+        streamed, listed = io.BytesIO(), io.BytesIO()
+        converter.dump_yaml(converter.iter_xml_to_yaml(xml_content), streamed)
+        converter.dump_yaml(converter.xml_to_yaml(xml_content), listed)
+        assert streamed.getvalue() == listed.getvalue()
+        assert yaml.safe_load(streamed.getvalue()) == [
+            {'from': 'a@example.com', 'label': 'A'},
+            {'from': 'b@example.com', 'star': True},
+        ]
+        
+        empty = io.BytesIO()
+        converter.dump_yaml(iter([]), empty)
+        assert yaml.safe_load(empty.getvalue()) == []
+    
+    def test_report_differences(self, capsys):
+        """Test missing, extra and changed properties are all reported."""
+        GmailFilterConverter()._report_differences(
+            [{'from': 'a', 'label': 'x', 'size': '5'}],
+            [{'from': 'a', 'label': 'y', 'to': 'b'}],
+        )
+        err = capsys.readouterr().err
+        assert "Missing in restored: {'size'}" in err
+        assert "Extra in restored: {'to'}" in err
+        assert "label: 'x' → 'y'" in err
+        assert "from:" not in err
+    
     def test_xml_to_yaml_with_verbose(self):
         """Test XML to YAML conversion with verbose output."""
         xml_content = '''<?xml version='1.0' encoding='UTF-8'?>
@@ -360,7 +543,7 @@ class TestXMLConverterCoverage:
             prop.set('name', name)
             prop.set('value', value)
         
-        filter_dict = converter._convert_xml_entry(entry, {'apps': 'http://schemas.google.com/apps/2006'}, 0)
+        filter_dict = converter._convert_xml_entry(entry, 0)
         
         assert filter_dict['has'] == 'important'
         assert filter_dict['does_not_have'] == 'spam'
@@ -371,4 +554,13 @@ class TestXMLConverterCoverage:
         assert filter_dict['spam'] is True
         assert filter_dict['not_spam'] is True
         assert filter_dict['star'] is True
-        assert filter_dict['trash'] is True
\ No newline at end of file
+        assert filter_dict['trash'] is True
+    
+    def test_property_tables_are_read_only(self):
+        """Test the class-level property tables can't be changed in place."""
+        with pytest.raises(TypeError):
+            GmailFilterConverter.YAML_TO_XML_MAP['cc'] = 'cc'
+        with pytest.raises(TypeError):
+            GmailFilterConverter.CLEANABLE_DEFAULTS['size'] = '0'
+        with pytest.raises(AttributeError):
+            GmailFilterConverter.BOOLEAN_PROPERTIES.add('shouldSpam')
@@ -163,6 +163,29 @@ class TestXMLConverterEnhancements:
         
         assert len(hierarchies) == 1
     
+    def test_detect_hierarchies_checks_only_key_supersets(self, monkeypatch):
+        """Test only filters with more condition keys are checked as children."""
+        converter = GmailFilterConverter(infer_more=True, infer_strategy='aggressive')
+        
+        filters = [
+            {'from': 'alerts@example.com', 'label': 'Alerts'},
+            {'to': 'me@example.com', 'subject': 'alert', 'label': 'Mine'},
+            {'from': 'alerts@example.com', 'has': 'error', 'label': 'Alerts/Error'},
+            {'from': 'other@example.com', 'subject': 'hi', 'label': 'Other'},
+        ]
+        checked = []
+        original_check = GmailFilterConverter._basic_child_check
+        
+        def recording_check(self, parent, child, parent_conditions, child_conditions):
+            checked.append((filters.index(parent), filters.index(child)))
+            return original_check(self, parent, child, parent_conditions, child_conditions)
+        
+        monkeypatch.setattr(GmailFilterConverter, '_basic_child_check', recording_check)
+        hierarchies = converter._detect_hierarchies(filters)
+        
+        assert hierarchies == [{'parent': 0, 'children': [2]}]
+        assert checked == [(0, 2), (0, 3)]
+    
     # ========== Build More Structures Tests ==========
     
     def test_build_more_structure(self):
@@ -274,6 +297,14 @@ class TestXMLConverterEnhancements:
         assert converter._has_value_extends("urgent", "(urgent AND meeting)") is True
         assert converter._has_value_extends("urgent", "important") is False
     
+    def test_has_value_extends_with_quoted_parent(self):
+        """Test a quoted parent phrase matches an unquoted AND term."""
+        converter = GmailFilterConverter()
+        
+        assert converter._has_value_extends('"pull request"', '(pull request AND review)') is True
+        assert converter._has_value_extends('"pull"', '(pull request AND review)') is False
+        assert converter._has_value_extends('"pull request"', 'pull request review') is False
+    
     def test_has_value_extends_with_dicts(self):
         """Test has_value_extends with dict values."""
         converter = GmailFilterConverter()
@@ -345,7 +376,6 @@ class TestXMLConverterEnhancements:
                 'sizeUnit': 's_smb',
                 'excludeChats': 'false'
             }),
-            {'apps': 'http://schemas.google.com/apps/2006'},
             0
         )
         
@@ -365,7 +395,6 @@ class TestXMLConverterEnhancements:
                 'sizeOperator': 's_sl',
                 'sizeUnit': 's_smb'
             }),
-            {'apps': 'http://schemas.google.com/apps/2006'},
             0
         )
         